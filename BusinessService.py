@@ -1,10 +1,61 @@
-from flask import Flask, request
+from hashlib import sha1
+from time import perf_counter
+from flask import Flask, Response, g, make_response, request, stream_with_context
+from werkzeug.http import quote_etag
 from flask_restplus import Api, Resource
 from business import cinema_service, errors
+from common import json_encoder, metrics
 
 
 business_service = Flask(__name__)
 api = Api(business_service)
+NDJSON = "application/x-ndjson"
+
+
+@api.representation("application/json")
+def output_json(data, code, headers=None):
+    ''' Encodes the JSON responses with the fastest available encoder
+        Successful responses carry an ETag, the SHA-1 of the body unless the resource provides it, so that a request with a matching If-None-Match header is answered with 304 and no body
+    '''
+    body = json_encoder.dumps(data)
+    response = make_response(body, code)
+    response.headers.extend(headers or {})
+    response.mimetype = "application/json"
+    if code == 200:
+        if "ETag" not in response.headers:
+            response.set_etag(sha1(body).hexdigest())
+        response.make_conditional(request)
+    return response
+
+
+def not_modified(digest):
+    ''' Returns the 304 response for a request whose If-None-Match header matches the digest of the wanted data '''
+    response = Response(status=304)
+    response.set_etag(digest)
+    return response
+
+
+def etag(digest):
+    ''' Returns the headers carrying the given digest as ETag, otherwise no header if there is no digest '''
+    return {"ETag": quote_etag(digest)} if digest else {}
+
+
+def wants_stream():
+    ''' Returns True if the client asked for a streamed response, by "stream=ndjson" parameter or by Accept header '''
+    return request.args.get("stream") == "ndjson" or request.accept_mimetypes.best_match(["application/json", NDJSON]) == NDJSON
+
+
+def stream(items):
+    ''' Returns a NDJSON response writing each item as soon as it is yielded, otherwise None (null object) if there is no item '''
+    items = iter(items)
+    first = next(items, None)
+    if first is None:
+        return
+    def lines():
+        yield json_encoder.dumps(first) + b"\n"
+        for item in items:
+            yield json_encoder.dumps(item) + b"\n"
+    return Response(stream_with_context(lines()), mimetype=NDJSON)
 
 
 ''' Resource Nearby is mapped to URI "/nearby" '''
@@ -17,6 +68,7 @@ class Nearby(Resource):
                 - datetime: string representing the device datetime in ISO format
             Parameters: 
                 - n (optional): integer representing the maximum number of cinemas to fetch
+                - stream (optional): "ndjson" for streaming a cinema per line, as the application/x-ndjson Accept header does
             Returns: JSON object containing the dataset if response is OK
         '''
         n = request.args.get("n")
@@ -24,7 +76,10 @@ class Nearby(Resource):
         datetime = request.headers.get("datetime")
         if not (position and datetime):
             return errors.missing_headers("position, datetime")
-        nearby = cinema_service.findNearby(position, datetime, n)
+        if wants_stream():
+            nearby = stream(cinema_service.streamNearby(position, datetime, n))
+        else:
+            nearby = cinema_service.findNearby(position, datetime, n)
         return nearby if nearby else errors.not_found("nearby")
 
 
@@ -70,8 +125,13 @@ class DetailedShowings(Resource):
             return errors.missing_headers("position, datetime")
         if not (cinemaId and date):
             return errors.missing_args("cinema_id, date")
+        digest = cinema_service.findShowingsDigest(position, datetime, cinemaId, date, request.if_none_match)
+        if digest and digest in request.if_none_match:
+            return not_modified(digest)
         showings = cinema_service.findDetailedShowings(position, datetime, cinemaId, date)
-        return showings if showings else errors.not_found("cinema_id={}, date={}".format(cinemaId, date))
+        if not showings:
+            return errors.not_found("cinema_id={}, date={}".format(cinemaId, date))
+        return showings, 200, etag(None if showings.get("stale") else cinema_service.findShowingsDigest(position, datetime, cinemaId, date))
 
 
 ''' Resource Showings is mapped to URI "/showings" '''
@@ -85,6 +145,7 @@ class Showings(Resource):
             Parameters:
                 - cinema_id: string representing the cinema ID
                 - date: string representing the date in "YYYY-MM-DD" format
+                - stream (optional): "ndjson" for streaming a film per line, as the application/x-ndjson Accept header does
             Returns: JSON object containing the dataset if response is OK
         '''
         cinemaId = request.args.get("cinema_id")
@@ -95,8 +156,16 @@ class Showings(Resource):
             return errors.missing_headers("position, datetime")
         if not (cinemaId and date):
             return errors.missing_args("cinema_id, date")
+        if wants_stream():
+            showings = stream(cinema_service.streamShowings(position, datetime, cinemaId, date))
+            return showings if showings else errors.not_found("cinema_id={}, date={}".format(cinemaId, date))
+        digest = cinema_service.findShowingsDigest(position, datetime, cinemaId, date, request.if_none_match)
+        if digest and digest in request.if_none_match:
+            return not_modified(digest)
         showings = cinema_service.findShowings(position, datetime, cinemaId, date)
-        return showings if showings else errors.not_found("cinema_id={}, date={}".format(cinemaId, date))
+        if not showings:
+            return errors.not_found("cinema_id={}, date={}".format(cinemaId, date))
+        return showings, 200, etag(None if showings.get("stale") else cinema_service.findShowingsDigest(position, datetime, cinemaId, date))
 
 
 ''' Resource Showtimes is mapped to URI "/showtimes" '''
@@ -107,17 +176,41 @@ class Showtimes(Resource):
             Parameters:
                 - cinema_id: string representing the cinema ID
                 - film_id: string representing the film ID
+                - date (optional): string representing the date in "YYYY-MM-DD" format
             Returns: JSON object containing the dataset if response is OK
         '''
         cinemaId = request.args.get("cinema_id")
         filmId = request.args.get("film_id")
+        date = request.args.get("date")
         if not (cinemaId and filmId):
             return errors.missing_args("cinema_id, film_id")
-        showtimes = cinema_service.findShowtimes(cinemaId, filmId)
+        showtimes = cinema_service.findShowtimes(cinemaId, filmId, date)
         return showtimes if showtimes else errors.not_found("cinema_id={}, film_id={}".format(cinemaId, filmId))
 
 
 
+@business_service.route("/metrics")
+def scrape_metrics():
+    ''' GET method for retrieve the metrics of this worker in Prometheus text format '''
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+metrics.describe("business_request_duration_seconds", "Duration of the requests served by each resource")
+
+
+@business_service.before_request
+def start_timer():
+    g.start = perf_counter()
+
+
+@business_service.after_request
+def record_duration(response):
+    if request.endpoint != "scrape_metrics" and "start" in g:
+        metrics.observe("business_request_duration_seconds", perf_counter() - g.start,
+                        resource=request.endpoint, status=response.status_code)
+    return response
+
+
 @business_service.teardown_appcontext
 def cleanup(error=None):
     cinema_service.cleanCache()
@@ -1,59 +1,246 @@
-from json import load
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+from functools import lru_cache
+from json import dumps, load, loads
+from os import environ, path
+from time import perf_counter
+from common import CircuitBreaker, SingleFlight, TTLCache, metrics
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import requests
 
 
+CONFIG_PATH = path.join(path.dirname(path.abspath(__file__)), "config.json")
+
+
+@lru_cache(maxsize=None)
+def load_configs(file=CONFIG_PATH):
+    ''' Reads the settings of the adapter, once per process and its forks '''
+    with open(file, "r") as config:
+        return load(config)
+
+
 class AdapterService():
     ''' This class interacts with cinema-adapter service to retrieve resources from MoviesGlu
         Exposed methods:
+            > iterCinemasInfo(): given a list of cinemas, retrieves their information concurrently, yielding each one as soon as it is ready
             > getNearby(): given GPS location, retrieves the list of nearby cinemas
             > getShowtimes(): given a cinema ID and a date, retrieves the shotimes for the wanted date 
+            > isAvailable(): given an endpoint, tells whether its circuit breaker is closed
+            > cacheStats(): retrieves hit/miss counters of the response cache
+        Each endpoint has its own circuit breaker: while it is open the requests fail fast, and the responses are served
+        from the cache even if expired, marked by a "stale" attribute
     '''
     
+    ENDPOINTS = ("cinemainfo", "cinemaroute", "nearby", "showtimes")
+    
+    DATETIME_GRANULARITY = {"year": 4, "month": 7, "day": 10, "hour": 13, "minute": 16}
+    
     def __init__(self):
         ''' Constructor of the class '''
-        configs = load(open("./adapter/config.json", "r"))
-        self.__server = configs.get("cinema-adapter")
+        configs = load_configs()
+        self.__server = environ.get("CINEMA_ADAPTER_URL", configs.get("cinema-adapter"))
+        concurrency = configs.get("concurrency", {})
+        self.__timeout = concurrency.get("timeout")
+        self.__executor = ThreadPoolExecutor(max_workers=concurrency.get("max-workers", 8))
+        self.__session = self.__build_session(configs.get("http", {}))
+        cache = configs.get("cache", {})
+        self.__cache = TTLCache(cache.get("max-entries", 1024), cache.get("max-bytes"))
+        self.__cache_grid = cache.get("grid")
+        self.__cache_endpoints = cache.get("endpoints", {})
+        self.__flight = SingleFlight()
+        breaker = configs.get("breaker", {})
+        self.__breakers = {endpoint: CircuitBreaker(breaker.get("failures", 5), breaker.get("reset", 30)) for endpoint in self.ENDPOINTS}
+        metrics.describe("adapter_request_duration_seconds", "Duration of the requests towards cinema-adapter")
+        metrics.describe("adapter_cache_requests_total", "Lookups of the adapter response cache")
+        metrics.describe("adapter_breaker_rejections_total", "Requests towards cinema-adapter rejected by an open circuit breaker")
+        metrics.collect(self.__collect)
+    
+    
+    def __build_session(self, configs):
+        ''' Method for building the HTTP session shared by all the requests towards cinema-adapter
+            NOTE: only failed connections are retried, a request that was sent is never repeated, so that the worst case of a call is
+                  (retries + 1) * connect-timeout + read-timeout plus the backoff, within the worker timeout even for nearby searches and their fan-out
+            Arguments:
+                - configs: map of HTTP client settings (pool size, timeouts and retry policy)
+            Returns: a requests Session holding a pool of keep-alive connections
+        '''
+        self.__http_timeout = (configs.get("connect-timeout"), configs.get("read-timeout"))
+        retry = Retry(total=configs.get("retries", 0),
+                      connect=configs.get("retries", 0),
+                      read=0,
+                      status=0,
+                      backoff_factor=configs.get("backoff-factor", 0),
+                      raise_on_status=False)
+        pool = HTTPAdapter(pool_connections=1, pool_maxsize=configs.get("pool-size", 10), max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", pool)
+        session.mount("https://", pool)
+        return session
     
     
     def __get_request(self, request, headers=None, params=None,):
         ''' Method for performing HTTP GET requests
+            NOTE: timeouts, connection errors and server errors are recorded as failures by the circuit breaker of the endpoint
             Arguments:
                 - request: string containing the URI of the request
                 - headers (optional): map of further headers to include in the request
                 - params (optional): map of parameters to provide via GET
             Returns: JSON object if status code is OK, otherwise None (null object)
         '''
-        response = requests.get(url=request, headers=headers, params=params)
+        endpoint = request.rsplit("/", 1)[-1]
+        breaker = self.__breakers[endpoint]
+        start = perf_counter()
+        try:
+            response = self.__session.get(url=request, headers=headers, params=params, timeout=self.__http_timeout)
+        except requests.exceptions.RequestException as error:
+            status = "timeout" if isinstance(error, requests.exceptions.Timeout) else "error"
+            metrics.observe("adapter_request_duration_seconds", perf_counter() - start, endpoint=endpoint, status=status)
+            breaker.failure()
+            return None
+        metrics.observe("adapter_request_duration_seconds", perf_counter() - start, endpoint=endpoint, status=response.status_code)
+        if response.status_code >= 500:
+            breaker.failure()
+        else:
+            breaker.success()
         if response.status_code == requests.codes.get("ok"):
             return response.json()
+    
+    
+    def __collect(self):
+        ''' Method providing the response cache occupation to the metrics scrapes '''
+        stats = self.__cache.stats()
+        return [
+            ("adapter_cache_entries", "gauge", {}, stats.get("entries")),
+            ("adapter_cache_bytes", "gauge", {}, stats.get("bytes")),
+            ("adapter_cache_evictions_total", "counter", {}, stats.get("evictions"))
+        ] + [("adapter_breaker_open", "gauge", {"endpoint": endpoint}, int(breaker.isOpen())) for endpoint, breaker in self.__breakers.items()]
+    
+    
+    def __snap_position(self, geolocation):
+        ''' Method for rounding a GPS position to the configured grid, so that close positions share the same cache entry
+            Arguments:
+                - geolocation: string representing the geographic coordinates in "float(x);float(y)" format
+            Returns: string containing the rounded position, or the given one if it is not well formed
+        '''
+        try:
+            lat, lng = (float(v) for v in geolocation.split(";"))
+        except (AttributeError, ValueError):
+            return geolocation
+        return "{:.6f};{:.6f}".format(round(lat / self.__cache_grid) * self.__cache_grid, round(lng / self.__cache_grid) * self.__cache_grid)
+    
+    
+    def __cache_key(self, endpoint, headers, params):
+        ''' Method for computing the normalized cache key of a request
+            Arguments:
+                - endpoint: string containing the cinema-adapter resource name
+                - headers: map of headers of the request
+                - params: map of parameters of the request
+            Returns: a tuple identifying the request
+        '''
+        items = dict(headers or {}, **(params or {}))
+        if self.__cache_grid and "geolocation" in items:
+            items["geolocation"] = self.__snap_position(items.get("geolocation"))
+        granularity = self.DATETIME_GRANULARITY.get(self.__cache_endpoints.get(endpoint, {}).get("datetime"))
+        if granularity and items.get("datetime"):
+            items["datetime"] = items.get("datetime")[:granularity]
+        return (endpoint,) + tuple(sorted((k, "{}".format(v)) for k, v in items.items()))
+    
+    
+    def __fetch(self, endpoint, headers, params, key, ttl):
+        ''' Method for performing a request towards cinema-adapter and storing its response into the cache
+            Arguments:
+                - endpoint: string containing the cinema-adapter resource name
+                - headers: map of further headers to include in the request
+                - params: map of parameters to provide via GET
+                - key: tuple identifying the request in the cache
+                - ttl: number of seconds the response is cached for
+            Returns: JSON encoded string if status code is OK, otherwise None (null object)
+        '''
+        result = self.__get_request("{}/{}".format(self.__server, endpoint), headers, params)
+        if result is None:
+            return None
+        encoded = dumps(result)
+        if ttl:
+            self.__cache.put(key, encoded, ttl, len(encoded))
+        return encoded
+    
+    
+    def __cached_request(self, endpoint, headers=None, params=None, fresh=False):
+        ''' Method for performing HTTP GET requests towards cinema-adapter through the response cache
+            NOTE: concurrent identical requests are coalesced into a single upstream request
+                  while the circuit breaker of the endpoint is open, the expired cached response is returned marked as stale
+            Arguments:
+                - endpoint: string containing the cinema-adapter resource name
+                - headers (optional): map of further headers to include in the request
+                - params (optional): map of parameters to provide via GET
+                - fresh (optional): boolean forcing the request upstream, the response still replaces the cached one
+            Returns: JSON object if cached or if status code is OK, otherwise None (null object)
+        '''
+        ttl = self.__cache_endpoints.get(endpoint, {}).get("ttl", 0)
+        key = self.__cache_key(endpoint, headers, params)
+        encoded = self.__cache.get(key) if ttl and not fresh else None
+        metrics.inc("adapter_cache_requests_total", endpoint=endpoint, result="miss" if encoded is None else "hit")
+        if encoded is None and not self.__breakers[endpoint].allow():
+            metrics.inc("adapter_breaker_rejections_total", endpoint=endpoint)
+            encoded = None if fresh else self.__cache.get(key, stale=True)
+            if encoded is not None:
+                result = loads(encoded)
+                result["stale"] = True
+                return result
+            return None
+        if encoded is None:
+            encoded = self.__flight.do(key, self.__fetch, endpoint, headers, params, key, ttl)
+        if encoded is not None:
+            return loads(encoded)
         
     
-    def getCinemaInfo(self, lat, lng, name):
+    def getCinemaInfo(self, lat, lng, name, fresh=False):
         ''' Method for retrieve information about a given cinema
             Headers:
                 - lat, lng: pair of strings containing the cinema GPS position
             Arguments:
                 - name: string containing the venue name
+                - fresh (optional): boolean bypassing the response cache
             Returns: JSON object if status code is OK, otherwise None (null object)
         '''
-        request = "{}/cinemainfo".format(self.__server)
         headers = {"lat": "{}".format(lat), "lng": "{}".format(lng)}
         params = {"name": name}
-        return self.__get_request(request, headers, params)    
+        return self.__cached_request("cinemainfo", headers, params, fresh)    
+    
+    
+    def iterCinemasInfo(self, cinemas):
+        ''' Method for retrieve information about several cinemas by issuing the requests concurrently, in completion order
+            Arguments:
+                - cinemas: list of maps containing "lat", "lng" and "cinema_name" of each cinema
+            Returns: generator of (index, JSON object) pairs, where index is the position in cinemas and the object is None (null object) for each failed or timed out request
+        '''
+        futures = {self.__executor.submit(self.getCinemaInfo, c.get("lat"), c.get("lng"), c.get("cinema_name")): i for i, c in enumerate(cinemas)}
+        pending = set(futures)
+        try:
+            for future in as_completed(futures, timeout=self.__timeout):
+                pending.discard(future)
+                yield futures[future], None if future.exception() else future.result()
+        except TimeoutError:
+            pass
+        finally:
+            for future in pending:
+                future.cancel()
+        for future in pending:
+            yield futures[future], None
     
     
     def getCinemaRoute(self, geolocation, lat, lng):
         ''' Method for retrieve the route from the device location to the cinema location
+            NOTE: routes are not kept in the response cache, the ROUTES table of the cache service stores them on its own grid
             Headers:
                 - geolocation: string containing the GPS position of the device
             Parameters: 
                 - lat, lng: pairs of strings containing the cinema GPS position
             Returns: JSON object if status code is OK, otherwise None (null object)
         '''
-        request = "{}/cinemaroute".format(self.__server)
         headers = {"geolocation": geolocation}
         params = {"lat": "{}".format(lat), "lng": "{}".format(lng)}
-        return self.__get_request(request, headers, params)
+        return self.__cached_request("cinemaroute", headers, params)
         
     
     def getNearby(self, geolocation, datetime, n=None):
@@ -64,23 +251,37 @@ class AdapterService():
                 - n (optional): integer representing the maximum number of elements to return
             Return: JSON object if status code is OK, otherwise None (null object)
         '''
-        request = "{}/nearby".format(self.__server)
         headers = {"geolocation": geolocation, "datetime": datetime}
         params = {"n": n} if n else None
-        return self.__get_request(request, headers, params)
+        return self.__cached_request("nearby", headers, params)
         
     
-    def getShowtimes(self, geolocation, datetime, cinema, date):
+    def getShowtimes(self, geolocation, datetime, cinema, date, fresh=False):
         ''' Method for retrieve the showtimes in a date for a given cinema
             Arguments:
                 - geolocation: string containing the GPS position of the device
                 - datetime: string containing the device datetime in ISO format
                 - cinema_id: string containing the cinema ID
                 - date: string containing the date in YYYY-MM-DD format
+                - fresh (optional): boolean bypassing the response cache
             Returns: JSON object if status code is OK, otherwise None (null object)
         '''
-        request = "{}/showtimes".format(self.__server)
         headers = {"geolocation": geolocation, "datetime": datetime}
         params = {"cinema_id": cinema, "date": date}
-        return self.__get_request(request, headers, params)
-        
+        return self.__cached_request("showtimes", headers, params, fresh)
+    
+    
+    def isAvailable(self, endpoint):
+        ''' Method for checking whether the circuit breaker of an endpoint is closed
+            Arguments:
+                - endpoint: string containing the cinema-adapter resource name
+            Returns: False if the circuit breaker of the endpoint is open or half-open, otherwise True
+        '''
+        return not self.__breakers[endpoint].isOpen()
+    
+    
+    def cacheStats(self):
+        ''' Method for retrieve the counters of the response cache
+            Returns: a dictionary containing hits, misses, hit ratio, evictions, entries and bytes
+        '''
+        return self.__cache.stats()
@@ -0,0 +1,105 @@
+from datetime import date as Date, datetime as DateTime, timedelta
+from time import sleep
+from zlib import crc32
+
+
+class FakeAdapterService():
+    ''' This class mimics AdapterService without any network access, answering with deterministic generated data
+        It is used for running the service and its background jobs offline (CINEMA_ADAPTER=fake) and by the benchmarks
+        Exposed methods: the same of AdapterService
+    '''
+    
+    def __init__(self, films=10, cinemas=10, latency=0):
+        ''' Constructor of the class
+            Arguments:
+                - films (optional): integer representing the number of films showed by each cinema
+                - cinemas (optional): integer representing the default number of nearby cinemas
+                - latency (optional): number of seconds each call waits before answering
+        '''
+        self.__films = films
+        self.__cinemas = cinemas
+        self.__latency = latency
+        self.calls = 0
+    
+    
+    def __call(self):
+        ''' Method for simulating the upstream round-trip '''
+        self.calls += 1
+        if self.__latency:
+            sleep(self.__latency)
+    
+    
+    def __position(self, geolocation):
+        ''' Method for parsing a GPS position, defaulting to (0,0) if it is not well formed '''
+        try:
+            return tuple(float(v) for v in geolocation.split(";"))
+        except (AttributeError, ValueError):
+            return 0.0, 0.0
+    
+    
+    def getCinemaInfo(self, lat, lng, name, fresh=False):
+        self.__call()
+        return {"cinemainfo": {
+            "contact": {"phone": "+39 049 {:07d}".format(crc32(name.encode()) % 10 ** 7)},
+            "url": {"website": "https://example.org/{}".format(name.replace(" ", "-").lower())},
+            "hours": {"monday": ["15:00", "23:30"], "saturday": ["14:00", "01:00"]}
+        }}
+    
+    
+    def iterCinemasInfo(self, cinemas):
+        for i, c in enumerate(cinemas):
+            yield i, self.getCinemaInfo(c.get("lat"), c.get("lng"), c.get("cinema_name"))
+    
+    
+    def getCinemaRoute(self, geolocation, lat, lng):
+        self.__call()
+        return {"cinemaroute": {
+            "map_url": "https://example.org/map?center={},{}".format(lat, lng),
+            "route_url": "https://example.org/route?from={}&to={},{}".format(geolocation, lat, lng)
+        }}
+    
+    
+    def getNearby(self, geolocation, datetime, n=None):
+        self.__call()
+        lat, lng = self.__position(geolocation)
+        cinemas = []
+        for i in range(int(n) if n else self.__cinemas):
+            cinemaId = "{:d}".format(crc32("{:.2f};{:.2f};{:d}".format(lat, lng, i).encode()) % 10 ** 6)
+            cinemas.append({
+                "cinema_id": cinemaId,
+                "cinema_name": "Cinema {}".format(cinemaId),
+                "address": "Via Roma {:d}".format(i + 1),
+                "city": "Padova",
+                "lat": round(lat + 0.002 * (i + 1), 6),
+                "lng": round(lng - 0.002 * (i + 1), 6),
+                "distance": 0.2 * (i + 1)
+            })
+        return {"cinemas": cinemas}
+    
+    
+    def getShowtimes(self, geolocation, datetime, cinema, date, fresh=False):
+        self.__call()
+        day = Date.fromisoformat(date) if date else Date.today()
+        films = []
+        for i in range(self.__films):
+            filmId = "{:d}".format(crc32("{};{:d}".format(cinema, i).encode()) % 10 ** 6)
+            times = []
+            for hour in range(14, 24, 2):
+                start = DateTime(day.year, day.month, day.day, hour, 15 * (i % 4))
+                times.append({"start_time": start.strftime("%H:%M"), "end_time": (start + timedelta(minutes=110)).strftime("%H:%M")})
+            films.append({
+                "film_id": filmId,
+                "imdb_id": "tt{:07d}".format(int(filmId)),
+                "film_name": "Film {}".format(filmId),
+                "showings": {"Standard": {"film_id": filmId, "film_name": "Film {}".format(filmId), "times": times}},
+                "show_dates": [{"date": (day + timedelta(days=d)).isoformat()} for d in range(7)]
+            })
+        return {"cinema": {"cinema_id": cinema, "cinema_name": "Cinema {}".format(cinema)}, "films": films}
+    
+    
+    def isAvailable(self, endpoint):
+        return True
+    
+    
+    def cacheStats(self):
+        return {"hits": 0, "misses": self.calls, "ratio": 0.0, "evictions": 0, "entries": 0, "bytes": 0}
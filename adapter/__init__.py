@@ -1,4 +1,6 @@
+from os import environ
 from adapter.AdapterService import AdapterService
+from adapter.FakeAdapterService import FakeAdapterService
+from common import Lazy
 
-adapter_service = AdapterService()
-
+adapter_service = Lazy(lambda: FakeAdapterService() if environ.get("CINEMA_ADAPTER") == "fake" else AdapterService())
@@ -0,0 +1,91 @@
+''' Load test of the BusinessService endpoints
+    Usage: python -m benchmarks.load_test [--url http://127.0.0.1:8000] [--requests 500] [--concurrency 20] [--endpoints nearby,cinema,...]
+    It discovers cinema and film IDs through /nearby and /showings, then sends the scripted requests to each endpoint
+    and reports throughput and latency percentiles. Only the Python standard library is used.
+'''
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from json import loads
+from random import choice
+from time import perf_counter
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+
+POSITION = "45.4064;11.8768"
+ENDPOINTS = ["nearby", "cinema", "showings", "detailedShowings", "showtimes"]
+
+
+def get(url, path, params, headers):
+    ''' Performs a GET request, returning the status code and the decoded body (None if not JSON) '''
+    request = Request("{}/{}?{}".format(url, path, urlencode(params)), headers=headers)
+    try:
+        with urlopen(request, timeout=30) as response:
+            return response.status, loads(response.read() or "null")
+    except HTTPError as error:
+        return error.code, None
+    except (URLError, OSError, ValueError):
+        return 0, None
+
+
+def percentile(values, p):
+    ''' Returns the p-th percentile of the sorted values '''
+    return values[min(int(len(values) * p / 100), len(values) - 1)] if values else float("nan")
+
+
+def scenario(url, endpoint, cinemas, films):
+    ''' Returns a function performing one request to the endpoint with random arguments '''
+    headers = {"position": POSITION, "datetime": datetime.now().isoformat(timespec="seconds")}
+    today = date.today().isoformat()
+    requests = {
+        "nearby": lambda: get(url, "nearby", {"n": 20}, headers),
+        "cinema": lambda: get(url, "cinema", {"cinema_id": choice(cinemas)}, headers),
+        "showings": lambda: get(url, "showings", {"cinema_id": choice(cinemas), "date": today}, headers),
+        "detailedShowings": lambda: get(url, "detailedShowings", {"cinema_id": choice(cinemas), "date": today}, headers),
+        "showtimes": lambda: get(url, "showtimes", dict(zip(("cinema_id", "film_id"), choice(films)), date=today), headers)
+    }
+    return requests.get(endpoint)
+
+
+def run(request, total, concurrency):
+    ''' Sends total requests with the given concurrency, returning throughput, latencies and failures '''
+    def timed(_):
+        start = perf_counter()
+        status, body = request()
+        return perf_counter() - start, status
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, range(total)))
+    elapsed = perf_counter() - start
+    latencies = sorted(latency for latency, status in results)
+    failures = sum(1 for latency, status in results if status != 200)
+    return total / elapsed, latencies, failures
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="BusinessService load test")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=500, help="requests sent to each endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    args = parser.parse_args()
+    
+    headers = {"position": POSITION, "datetime": datetime.now().isoformat(timespec="seconds")}
+    status, nearby = get(args.url, "nearby", {"n": 20}, headers)
+    cinemas = [cinema.get("cinema_id") for cinema in (nearby or {}).get("cinemas", [])]
+    if not cinemas:
+        raise SystemExit("No cinemas found through /nearby (status {}), is the service running?".format(status))
+    films = []
+    for cinema in cinemas[:5]:
+        status, showings = get(args.url, "showings", {"cinema_id": cinema, "date": date.today().isoformat()}, headers)
+        films.extend((cinema, film.get("film_id")) for film in (showings or {}).get("films", []))
+    
+    print("{:<18} {:>10} {:>10} {:>10} {:>10} {:>9}".format("endpoint", "req/s", "p50 (ms)", "p95 (ms)", "p99 (ms)", "failures"))
+    for endpoint in args.endpoints.split(","):
+        if endpoint == "showtimes" and not films:
+            continue
+        throughput, latencies, failures = run(scenario(args.url, endpoint, cinemas, films), args.requests, args.concurrency)
+        print("{:<18} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f} {:>9d}".format(
+            endpoint, throughput, percentile(latencies, 50) * 1000, percentile(latencies, 95) * 1000, percentile(latencies, 99) * 1000, failures))
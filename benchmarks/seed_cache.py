@@ -0,0 +1,38 @@
+''' Seeds a cache database with generated cinemas and showtimes
+    Usage: CACHE_DATABASE_URL=sqlite:///bench.db python -m benchmarks.seed_cache [--cinemas 1000] [--films 30] [--days 3]
+    Cinemas are spread on a grid around Padova (45.40;11.87) so that nearby searches find them in the cache,
+    and the disc inscribed in the grid is recorded as covered by upstream searches.
+'''
+from argparse import ArgumentParser
+from datetime import date, timedelta
+from time import perf_counter
+from adapter.FakeAdapterService import FakeAdapterService
+from cache import cache_service
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Cache database seeder")
+    parser.add_argument("--cinemas", type=int, default=1000)
+    parser.add_argument("--films", type=int, default=30, help="films showed by each cinema")
+    parser.add_argument("--days", type=int, default=3, help="dates of showings stored for each film")
+    args = parser.parse_args()
+    fake = FakeAdapterService(args.films)
+    start = perf_counter()
+    side = max(int(args.cinemas ** 0.5), 1)
+    for first in range(0, args.cinemas, 100):
+        cinemas = []
+        for i in range(first, min(first + 100, args.cinemas)):
+            cinema = {"cinema_id": "{:d}".format(i), "cinema_name": "Cinema {:d}".format(i), "address": "Via Roma {:d}".format(i), "city": "Padova",
+                      "lat": 45.40 + 0.01 * (i // side - side / 2), "lng": 11.87 + 0.01 * (i % side - side / 2)}
+            cinema.update(fake.getCinemaInfo(cinema.get("lat"), cinema.get("lng"), cinema.get("cinema_name")).get("cinemainfo"))
+            cinemas.append(cinema)
+        cache_service.saveCinemas(cinemas)
+        for cinema in cinemas:
+            for day in range(args.days):
+                when = (date.today() + timedelta(days=day)).isoformat()
+                films = fake.getShowtimes(None, None, cinema.get("cinema_id"), when).get("films")
+                cache_service.saveShowtimesBatch([dict(film, cinema_id=cinema.get("cinema_id"), date=when) for film in films])
+    edge = 0.01 * (side / 2 - 1)
+    bounds = [{"lat": 45.40 + dlat, "lng": 11.87 + dlng} for dlat, dlng in ((edge, 0), (-edge, 0), (0, edge), (0, -edge))]
+    cache_service.saveCoverage("45.40;11.87", bounds, bounds)
+    print("Seeded {} cinemas, {} showtimes rows per day in {:.1f}s".format(args.cinemas, args.cinemas * args.films, perf_counter() - start))
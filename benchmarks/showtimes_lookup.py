@@ -0,0 +1,52 @@
+''' Benchmark of the SHOWTIMES (cinema_id, film_id) lookup with and without the composite unique index
+    Usage: python benchmarks/showtimes_lookup.py [sizes...]
+    It builds in-memory SQLite tables with the same layout of the cache and reports the mean lookup time per table size.
+'''
+from random import randrange
+from sys import argv
+from timeit import timeit
+import sqlite3
+
+
+SCHEMA = """CREATE TABLE SHOWTIMES (
+    id INTEGER NOT NULL PRIMARY KEY,
+    cinema_id VARCHAR(12) NOT NULL,
+    film_id VARCHAR(12) NOT NULL,
+    film_name VARCHAR(128) NOT NULL,
+    showings VARCHAR(1024) NOT NULL,
+    show_dates VARCHAR(1024) NOT NULL,
+    fetched_at DATETIME,
+    expires_at DATETIME
+)"""
+INDEX = "CREATE UNIQUE INDEX ux_SHOWTIMES_cinema_film ON SHOWTIMES (cinema_id, film_id)"
+LOOKUP = "SELECT * FROM SHOWTIMES WHERE cinema_id = ? AND film_id = ?"
+FILMS_PER_CINEMA = 30
+LOOKUPS = 2000
+
+
+def build(size, indexed):
+    ''' Creates a SHOWTIMES table with the given number of rows '''
+    connection = sqlite3.connect(":memory:")
+    connection.execute(SCHEMA)
+    if indexed:
+        connection.execute(INDEX)
+    rows = ((str(i // FILMS_PER_CINEMA), str(i % FILMS_PER_CINEMA), "film", "{}", "[]") for i in range(size))
+    connection.executemany("INSERT INTO SHOWTIMES (cinema_id, film_id, film_name, showings, show_dates) VALUES (?, ?, ?, ?, ?)", rows)
+    connection.commit()
+    return connection
+
+
+def measure(size, indexed):
+    ''' Returns the mean time in microseconds of a lookup by (cinema_id, film_id) '''
+    connection = build(size, indexed)
+    keys = iter([(str(randrange(size) // FILMS_PER_CINEMA), str(randrange(FILMS_PER_CINEMA))) for _ in range(LOOKUPS)])
+    elapsed = timeit(lambda: connection.execute(LOOKUP, next(keys)).fetchone(), number=LOOKUPS)
+    connection.close()
+    return elapsed / LOOKUPS * 1e6
+
+
+if __name__ == "__main__":
+    sizes = [int(size) for size in argv[1:]] or [1000, 10000, 100000, 500000]
+    print("{:>10} {:>16} {:>16}".format("rows", "full scan (us)", "indexed (us)"))
+    for size in sizes:
+        print("{:>10} {:>16.1f} {:>16.1f}".format(size, measure(size, False), measure(size, True)))
@@ -0,0 +1,40 @@
+''' Benchmark of the worker startup: import of the business layer and first use of the cache and adapter services
+    Usage: python -m benchmarks.startup [--runs 10] [--database sqlite:///startup.db]
+    Each run spawns a fresh interpreter, as a gunicorn worker would do, using the fake CinemaAdapter.
+'''
+from argparse import ArgumentParser
+from os import environ
+from statistics import mean, median
+from subprocess import check_output
+from sys import executable
+
+
+PROBE = """
+from time import perf_counter
+start = perf_counter()
+from business import cinema_service
+from cache import cache_service
+from adapter import adapter_service
+imported = perf_counter()
+cache_service.getCinema("0")
+adapter_service.cacheStats()
+print(imported - start, perf_counter() - imported)
+"""
+
+
+def measure(database):
+    ''' Returns the seconds spent importing the services and the seconds spent on their first use, in a fresh interpreter '''
+    env = dict(environ, CINEMA_ADAPTER="fake", CACHE_DATABASE_URL=database, WARMER_ENABLED="false")
+    imported, used = check_output([executable, "-c", PROBE], env=env).split()
+    return float(imported), float(used)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Worker startup benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--database", default="sqlite:///startup.db", help="cache database URL, created by the first run")
+    args = parser.parse_args()
+    samples = [measure(args.database) for _ in range(args.runs)]
+    print("{:>12} {:>12} {:>12}".format("", "mean (ms)", "median (ms)"))
+    for label, values in (("import", [s[0] for s in samples]), ("first use", [s[1] for s in samples]), ("total", [sum(s) for s in samples])):
+        print("{:>12} {:>12.1f} {:>12.1f}".format(label, mean(values) * 1000, median(values) * 1000))
@@ -0,0 +1,54 @@
+''' Stub of the cinema-adapter service for offline benchmarks
+    Usage: python -m benchmarks.stub_adapter [--port 8765] [--latency 0.05] [--films 40] [--cinemas 50]
+    It answers /nearby, /cinemainfo, /cinemaroute and /showtimes with the generated data of FakeAdapterService,
+    after waiting the given latency. Point the service to it with CINEMA_ADAPTER_URL=http://127.0.0.1:<port>
+'''
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps
+from time import sleep
+from urllib.parse import parse_qs, urlparse
+from adapter.FakeAdapterService import FakeAdapterService
+
+
+def handler(fake, latency):
+    ''' Builds the request handler class answering with the data of the given FakeAdapterService '''
+    
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            headers = self.headers
+            routes = {
+                "/nearby": lambda: fake.getNearby(headers.get("geolocation"), headers.get("datetime"), params.get("n")),
+                "/cinemainfo": lambda: fake.getCinemaInfo(headers.get("lat"), headers.get("lng"), params.get("name", "")),
+                "/cinemaroute": lambda: fake.getCinemaRoute(headers.get("geolocation"), params.get("lat"), params.get("lng")),
+                "/showtimes": lambda: fake.getShowtimes(headers.get("geolocation"), headers.get("datetime"), params.get("cinema_id"), params.get("date"))
+            }
+            route = routes.get(url.path)
+            sleep(latency)
+            body = dumps(route()).encode() if route else b'{"error": "Not found"}'
+            self.send_response(200 if route else 404)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    return StubHandler
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Stub cinema-adapter service")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds waited before each response")
+    parser.add_argument("--films", type=int, default=40, help="films showed by each cinema")
+    parser.add_argument("--cinemas", type=int, default=50, help="cinemas returned by /nearby when n is not given")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler(FakeAdapterService(args.films, args.cinemas), args.latency))
+    print("Stub cinema-adapter listening on http://127.0.0.1:{}".format(args.port))
+    server.serve_forever()
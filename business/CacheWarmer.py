@@ -0,0 +1,129 @@
+from collections import Counter
+from datetime import date as Date, datetime, timedelta
+from os import environ
+from threading import Lock, Thread
+from time import sleep
+from common import RateLimiter, metrics
+
+
+WARMER_ENABLED = environ.get("WARMER_ENABLED", "true") == "true"
+WARMER_TOP = int(environ.get("WARMER_TOP", 20))
+WARMER_INTERVAL = int(environ.get("WARMER_INTERVAL", 300))
+WARMER_AHEAD = int(environ.get("WARMER_AHEAD", 1800))
+WARMER_RATE = float(environ.get("WARMER_RATE", 0.5))
+WARMER_DAYS = int(environ.get("WARMER_DAYS", 7))
+
+
+class CacheWarmer:
+    ''' This class keeps the cache of the most requested cinemas warm, refreshing their showings and information before they expire
+        Requests are counted per cinema and the counters are halved at every round, so that the ranking follows the recent traffic
+        Only the dates from today to WARMER_DAYS days ahead are kept warm, and a date is dropped once its refresh fails
+        Exposed methods:
+            > track(): records a request for the showings of a cinema in a date, starting the background refresh if needed
+            > refresh(): refreshes the top requested cinemas whose cached data are missing or expiring, off the request path
+        NOTE: cinema information is refreshed only for cinemas already cached, since it is built upon the nearby search results
+    '''
+    
+    def __init__(self, business, cache, top=WARMER_TOP, interval=WARMER_INTERVAL, ahead=WARMER_AHEAD, rate=WARMER_RATE, days=WARMER_DAYS):
+        ''' Constructor of the class
+            Arguments:
+                - business: CinemaBusiness instance performing the refreshes
+                - cache: EntityManager instance holding the cached entities
+                - top (optional): integer representing the number of cinemas to keep warm
+                - interval (optional): number of seconds between two refresh rounds
+                - ahead (optional): number of seconds before the expiry at which data are refreshed
+                - rate (optional): maximum number of upstream refreshes per second
+                - days (optional): number of days after today whose showings are refreshed
+        '''
+        self.__business = business
+        self.__cache = cache
+        self.__top = top
+        self.__interval = interval
+        self.__ahead = timedelta(seconds=ahead)
+        self.__limiter = RateLimiter(rate)
+        self.__days = days
+        self.__lock = Lock()
+        self.__counts = Counter()
+        self.__requests = {}
+        self.__thread = None
+        metrics.describe("warmer_failures_total", "Refresh rounds of the cache warmer failed with an error")
+    
+    
+    def __window(self, date):
+        ''' Method for parsing a date, checking that it is between today and the following days kept warm
+            Returns: the date in YYYY-MM-DD format, otherwise None (null object) if it is not well formed or out of the window
+        '''
+        try:
+            day = Date.fromisoformat(date)
+        except (TypeError, ValueError):
+            return None
+        today = datetime.utcnow().date()
+        if today <= day <= today + timedelta(days=self.__days):
+            return day.isoformat()
+    
+    def track(self, position, datetime, cinema, date):
+        ''' Method for recording a request for the showings of a cinema
+            Arguments:
+                - position: string containing GPS position
+                - datetime: string containing the device datetime in ISO format
+                - cinema: string containing the cinema ID
+                - date: string containing the date in YYYY-MM-DD format, the request is ignored if it is not within the days kept warm
+        '''
+        date = self.__window(date)
+        if not date:
+            return
+        with self.__lock:
+            self.__counts[cinema] += 1
+            request = self.__requests.setdefault(cinema, {"dates": set()})
+            request.update({"position": position, "datetime": datetime})
+            request.get("dates").add(date)
+            if WARMER_ENABLED and self.__thread is None:
+                self.__thread = Thread(target=self.__run, daemon=True)
+                self.__thread.start()
+    
+    
+    def __run(self):
+        ''' Method executed by the background thread, it refreshes the cache every interval '''
+        while True:
+            sleep(self.__interval)
+            try:
+                self.refresh()
+            except Exception:
+                metrics.inc("warmer_failures_total")
+            finally:
+                self.__business.cleanCache()
+    
+    
+    def __due(self, expiry):
+        ''' Method for check if cached data with the given expiry must be refreshed '''
+        return expiry is None or expiry - datetime.utcnow() < self.__ahead
+    
+    
+    def refresh(self):
+        ''' Method for refreshing the cached data of the top requested cinemas
+            Returns: the number of upstream refreshes performed
+        '''
+        with self.__lock:
+            top = [cinema for cinema, count in self.__counts.most_common(self.__top)]
+            requests = {}
+            for cinema in top:
+                request = self.__requests.get(cinema)
+                request["dates"] = {date for date in request.get("dates") if self.__window(date)}
+                requests[cinema] = dict(request, dates=sorted(request.get("dates")), tracked=request)
+            self.__counts = Counter({cinema: count // 2 for cinema, count in self.__counts.items() if count // 2})
+            self.__requests = {cinema: request for cinema, request in self.__requests.items() if cinema in self.__counts}
+        refreshes = 0
+        for cinema, request in requests.items():
+            expiry = self.__cache.getCinemaExpiry(cinema)
+            if expiry and self.__due(expiry):
+                self.__limiter.acquire()
+                refreshes += bool(self.__business.refreshCinema(cinema))
+            for date in request.get("dates"):
+                if self.__due(self.__cache.getShowingsExpiry(cinema, date)):
+                    self.__limiter.acquire()
+                    if self.__business.findShowings(request.get("position"), request.get("datetime"), cinema, date, fresh=True):
+                        refreshes += 1
+                    else:
+                        with self.__lock:
+                            request.get("tracked").get("dates").discard(date)
+        return refreshes
@@ -1,22 +1,63 @@
+from os import environ
 from adapter import adapter_service
 from cache import cache_service, clean_db
+from business.CacheWarmer import CacheWarmer
+
+
+NEARBY_MODE = environ.get("NEARBY_MODE", "local")
+NEARBY_RADIUS = float(environ.get("NEARBY_RADIUS", 5))
+NEARBY_MIN_CINEMAS = int(environ.get("NEARBY_MIN_CINEMAS", 10))
 
 
 class CinemaBusiness:
     ''' This class implements the business logic and interacts directly with the adapter service for retrieve information about cinemas
         Exposed methods:
-            > findCinema(): given a GPS position and the cinema ID, it retrieves the related instance from the cache.
+            > findCinema(): given a GPS position and the cinema ID, it retrieves the related instance from the cache, together with the cached route when the position is close to an already requested one.
             > findDetailedShowings(): given a GPS position, device datetime, cinema ID and a date, it retrieves all the showings of the related cinema in the precise date.
+              Showings and detailed showings share the same snapshot of the upstream payload, stored in the cache by whichever is requested first
             > findNearby(): given a GPS position, device datetime, it retrieves the nearby cinemas according to the client geolocation. Parameter n is optional and filters the number of items to return 
+              In "local" NEARBY_MODE, the cinemas are fetched from the cache when at least n (or NEARBY_MIN_CINEMAS) of them are within NEARBY_RADIUS km
+              and the disc reaching the farthest of them has been covered by upstream nearby searches not expired
             > findShowings(): given a GPS position, device datetime, cinema ID and a date, it retrieves all the showings and puts the related showtimes in the cache.
-            > findShowtimes(): given a cinema ID and a film ID, it retrieves the related showtimes from the cache.
+            > findShowingsDigest(): given a GPS position, device datetime, cinema ID and a date, it retrieves the digest identifying the version of the cached showings, and detailed showings
+            > findShowtimes(): given a cinema ID, a film ID and optionally a date, it retrieves the related showtimes from the cache.
+            > refreshCinema(): given a cinema ID, it fetches again the information about the cinema and updates the cache.
+            > streamNearby(), streamShowings(): the same of findNearby() and findShowings(), yielding each item as soon as it is ready
+        Requests for showings are tracked by a CacheWarmer, which refreshes the most requested cinemas in background.
+        When the adapter gives no result because its circuit breaker is open, the last cached data is served marked as stale.
     '''    
     
+    def __init__(self):
+        ''' Constructor of the class '''
+        self.__warmer = CacheWarmer(self, cache_service)
+    
+    
     def cleanCache(self):
-        ''' Method for clean the cache service database '''
+        ''' Method for clean the cache service database and periodically compact it '''
         clean_db()
+        cache_service.compactIfDue()
 
     
+    def __findLocalNearby(self, position, n, stale=False):
+        ''' Method for find nearby cinemas among the cached ones
+            Arguments:
+                - position: string containing GPS position
+                - n (optional): integer representing the maximum number of items to fetch
+                - stale (optional): boolean accepting the expired cinemas still kept by the cache, and any number of them, regardless of the coverage
+            Returns: a list of cinemas if the area is well covered by the cache, otherwise None (null object)
+        '''
+        try:
+            lat, lng = (float(v) for v in position.split(";"))
+            wanted = int(n) if n else NEARBY_MIN_CINEMAS
+        except ValueError:
+            return None
+        cinemas = cache_service.getNearbyCinemas(lat, lng, NEARBY_RADIUS, wanted, stale)
+        if stale and cinemas:
+            return cinemas
+        if len(cinemas) >= wanted and cache_service.isCovered(lat, lng, cinemas[-1].get("distance")):
+            return cinemas
+    
+    
     def findNearby(self, position, datetime, n):
         ''' Method for find nearby cinemas in the given GPS position
             Arguments:
@@ -25,17 +66,60 @@ class CinemaBusiness:
                 - n (optional): integer representing the maximum number of items to fetch
             Returns: a dictionary object containing the fetched data, otherwise a empty object if there is no result
         '''
+        cinemas = sorted(self.__iterNearby(position, datetime, n), key=lambda item: item[0])
+        if cinemas:
+            return {"cinemas": [cinema for _, cinema in cinemas]}
+    
+    
+    def streamNearby(self, position, datetime, n):
+        ''' Method for find nearby cinemas in the given GPS position, yielding each cinema as soon as it is ready
+            NOTE: cinemas fetched from the adapter are yielded in completion order, not by distance
+            Arguments:
+                - position: string containing GPS position
+                - datetime: string containing the device datetime in ISO format
+                - n (optional): integer representing the maximum number of items to fetch
+            Returns: a generator of dictionary objects, empty if there is no result
+        '''
+        return (cinema for _, cinema in self.__iterNearby(position, datetime, n))
+    
+    
+    def __iterNearby(self, position, datetime, n):
+        ''' Method for find nearby cinemas from the cache when the area is well covered, otherwise from the adapter
+            NOTE: cinemas fetched from the adapter are saved into the cache once all of them are yielded, or the consumer stops,
+                  except the ones whose information could not be fetched, so that their cached copy is not replaced by a partial one
+                  the area of a not stale search is recorded as covered up to the nearest cinema not saved
+                  if the adapter gives no result while its circuit breaker is open, the cinemas kept by the cache are yielded even if expired, marked as stale
+            Returns: a generator of (index, dictionary object) pairs, where index is the rank of the cinema by distance
+        '''
+        filters = ["cinema_id", "cinema_name"]
+        if NEARBY_MODE == "local":
+            local = self.__findLocalNearby(position, n)
+            if local:
+                for i, cinema in enumerate(local):
+                    yield i, {k:v for k,v in cinema.items() if k in filters}
+                return
         result = adapter_service.getNearby(position, datetime, n)
-        if result:
-            cinemas = []
-            filters = ["cinema_id", "cinema_name"]
-            for cinema in result.get("cinemas"):
-                response = adapter_service.getCinemaInfo(cinema.get("lat"), cinema.get("lng"), cinema.get("cinema_name"))
+        if not result:
+            if adapter_service.isAvailable("nearby"):
+                return
+            for i, cinema in enumerate(self.__findLocalNearby(position, n, stale=True) or []):
+                yield i, dict({k:v for k,v in cinema.items() if k in filters}, stale=True)
+            return
+        nearby = result.get("cinemas")
+        complete = []
+        try:
+            for i, response in adapter_service.iterCinemasInfo(nearby):
+                stale = result.get("stale") or (response and response.get("stale"))
                 if response:
-                    cinema.update(response.get("cinemainfo"))
-                cache_service.saveCinema(cinema)
-                cinemas.append({k:v for k,v in cinema.items() if k in filters})
-            return {"cinemas": cinemas}
+                    nearby[i].update(response.get("cinemainfo"))
+                    if not stale:
+                        complete.append(nearby[i])
+                cinema = {k:v for k,v in nearby[i].items() if k in filters}
+                yield i, dict(cinema, stale=True) if stale else cinema
+        finally:
+            cache_service.saveCinemas(complete)
+            if not result.get("stale"):
+                cache_service.saveCoverage(position, nearby, [cinema for cinema in nearby if cinema not in complete])
     
     
     def findCinema(self, position, cinema):
@@ -46,11 +130,62 @@ class CinemaBusiness:
             Returns: a dictionary object containing the fetched data, otherwise a empty object if there is no result
         '''
         result = cache_service.getCinema(cinema)
+        if not result and not adapter_service.isAvailable("cinemainfo"):
+            result = cache_service.getCinema(cinema, stale=True)
+            if result:
+                result["stale"] = True
         if not result: return
-        response = adapter_service.getCinemaRoute(position, result.get("lat"), result.get("lng"))
-        if response:
-            result.update(response.get("cinemaroute"))
+        route = cache_service.getRoute(cinema, position)
+        if not route:
+            response = adapter_service.getCinemaRoute(position, result.get("lat"), result.get("lng"))
+            if response:
+                route = response.get("cinemaroute")
+            elif not adapter_service.isAvailable("cinemaroute"):
+                route = cache_service.getRoute(cinema, position, stale=True)
+            if not route: return
+            if response and not response.get("stale"):
+                cache_service.saveRoute(cinema, position, route)
+            else:
+                result["stale"] = True
+        result.update(route)
+        return result
+    
+    
+    def __fetchShowings(self, position, datetime, cinema, date, fresh=False, projected=False):
+        ''' Method for retrieve the showtimes payload of a cinema in a date, from the cache if stored, otherwise from the adapter
+            NOTE: a payload fetched from the adapter is stored whole as snapshot, together with its projection and the showtimes of each film, in a single transaction
+                  if the adapter gives no result while its circuit breaker is open, the stored snapshot is returned even if expired, marked as stale
+            Arguments:
+                - position: string containing GPS position
+                - datetime: string containing the device datetime in ISO format
+                - cinema: string containing the cinema ID
+                - date: string containing the date in YYYY-MM-DD format
+                - fresh (optional): boolean bypassing both the stored snapshot and the adapter response cache
+                - projected (optional): boolean retrieving the projection of the payload on the showings attributes
+            Returns: a dictionary object containing the payload (or its projection), otherwise a empty object if there is no result
+        '''
+        result = None if fresh else cache_service.getSnapshot(cinema, date, projected=projected)
+        if result:
+            return result
+        result = adapter_service.getShowtimes(position, datetime, cinema, date, fresh)
+        if not result:
+            if not fresh and not adapter_service.isAvailable("showtimes"):
+                result = cache_service.getSnapshot(cinema, date, stale=True, projected=projected)
+                if result:
+                    result["stale"] = True
             return result
+        projection = {"films": [{k:v for k,v in film.items() if k in ["film_id", "imdb_id", "film_name"]} for film in result.get("films")]}
+        if result.get("stale"):
+            projection["stale"] = True
+        else:
+            showtimes = []
+            cacheFilters = ["film_id", "film_name", "showings", "show_dates"]
+            for film in result.get("films"):
+                showtime = {"cinema_id": cinema, "date": date}
+                showtime.update({k:v for k,v in film.items() if k in cacheFilters})
+                showtimes.append(showtime)
+            cache_service.saveShowtimesBatch(showtimes, {"cinema_id": cinema, "date": date, "payload": result, "projection": projection})
+        return projection if projected else result
     
     
     def findDetailedShowings(self, position, datetime, cinema, date):
@@ -62,39 +197,82 @@ class CinemaBusiness:
                 - date: string containing the date in YYYY-MM-DD format
             Returns: a dictionary object containing the fetched data, otherwise a empty object if there is no result
         '''
-        return adapter_service.getShowtimes(position, datetime, cinema, date)
+        self.__warmer.track(position, datetime, cinema, date)
+        return self.__fetchShowings(position, datetime, cinema, date)
     
     
-    def findShowings(self, position, datetime, cinema, date):
+    def findShowings(self, position, datetime, cinema, date, fresh=False):
         ''' Method for find information about showings and to cache the related showtimes
             Arguments:
                 - position: string containing GPS position
                 - datetime: string containing the device datetime in ISO format
                 - cinema: string containing the cinema ID
                 - date: string containing the date in YYYY-MM-DD format
+                - fresh (optional): boolean bypassing the cached data, used for refreshing the cache
             Returns: a dictionary object containing the fetched data, otherwise a empty object if there is no result
         '''
-        result = adapter_service.getShowtimes(position, datetime, cinema, date)
+        if not fresh:
+            self.__warmer.track(position, datetime, cinema, date)
+        return self.__fetchShowings(position, datetime, cinema, date, fresh, projected=True)
+    
+    
+    def findShowingsDigest(self, position, datetime, cinema, date, etags=()):
+        ''' Method for retrieve the digest of the showings cached for a cinema in a date, used as ETag of both showings and detailed showings
+            NOTE: the payload is neither read nor decoded, so that unchanged showings are answered cheaply
+                  a request whose ETags match the digest is answered without the showings, hence it is tracked here
+            Arguments:
+                - position: string containing GPS position
+                - datetime: string containing the device datetime in ISO format
+                - cinema: string containing the cinema ID
+                - date: string containing the date in YYYY-MM-DD format
+                - etags (optional): container of the ETags sent by the client
+            Returns: the digest if the showings are cached and not expired, otherwise None (null object)
+        '''
+        digest = cache_service.getSnapshotDigest(cinema, date)
+        if digest and digest in etags:
+            self.__warmer.track(position, datetime, cinema, date)
+        return digest
+    
+    
+    def streamShowings(self, position, datetime, cinema, date):
+        ''' Method for find information about showings, yielding each film as soon as the showtimes are cached
+            Arguments:
+                - position: string containing GPS position
+                - datetime: string containing the device datetime in ISO format
+                - cinema: string containing the cinema ID
+                - date: string containing the date in YYYY-MM-DD format
+            Returns: a generator of dictionary objects, empty if there is no result
+        '''
+        self.__warmer.track(position, datetime, cinema, date)
+        result = self.__fetchShowings(position, datetime, cinema, date, projected=True)
         if result:
-            films = []
-            filters = ["film_id", "imdb_id", "film_name"]
-            cacheFilters = ["film_id", "film_name", "showings", "show_dates"]
             for film in result.get("films"):
-                showtimes = {"cinema_id": cinema}
-                showtimes.update({k:v for k,v in film.items() if k in cacheFilters})
-                cache_service.saveShowtimes(showtimes)
-                films.append({k:v for k,v in film.items() if k in filters})
-            return {"films": films}
+                yield dict(film, stale=True) if result.get("stale") else film
     
     
-    def findShowtimes(self, cinema, film):
+    def findShowtimes(self, cinema, film, date=None):
         ''' Method for retrieve from the cache the information about showtimes for a given cinema and film
             Arguments:
                 - cinema: string containing the cinema ID
                 - film: string containing the film ID
+                - date (optional): string containing the date in YYYY-MM-DD format, the latest cached date if not provided
             Returns: a dictionary object containing the fetched data, otherwise a empty object if there is no result
         '''
-        result = cache_service.getShowtimes(cinema, film)
+        result = cache_service.getShowtimes(cinema, film, date)
         if result:
             return {"showtimes": result}
- 
+    
+    
+    def refreshCinema(self, cinema):
+        ''' Method for fetching again the information about a cached cinema and updating the cache
+            Arguments:
+                - cinema: string containing the cinema ID
+            Returns: a dictionary object containing the updated data, otherwise a empty object if the cinema is not cached or the request fails
+        '''
+        result = cache_service.getCinema(cinema)
+        if not result: return
+        response = adapter_service.getCinemaInfo(result.get("lat"), result.get("lng"), result.get("cinema_name"), fresh=True)
+        if response:
+            result.update(response.get("cinemainfo"))
+            cache_service.saveCinema(result)
+            return result
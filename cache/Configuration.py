@@ -1,18 +1,90 @@
-from sqlalchemy import create_engine
+from os import environ, getpid
+from sqlalchemy import create_engine, event, exc
 from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 
 
-Engine = create_engine("sqlite:///cache.db", convert_unicode=True)
+CINEMA_TTL = int(environ.get("CACHE_CINEMA_TTL", 7 * 24 * 3600))
+SHOWTIMES_TTL = int(environ.get("CACHE_SHOWTIMES_TTL", 24 * 3600))
+COMPACT_INTERVAL = int(environ.get("CACHE_COMPACT_INTERVAL", 3600))
+STALE_GRACE = int(environ.get("CACHE_STALE_GRACE", 86400))
+OBJECT_CACHE_ENTRIES = int(environ.get("CACHE_OBJECT_ENTRIES", 2048))
+OBJECT_CACHE_TTL = int(environ.get("CACHE_OBJECT_TTL", 60))
+GRID_SIZE = float(environ.get("CACHE_GRID_SIZE", 0.05))
+COVERAGE_GRID = float(environ.get("CACHE_COVERAGE_GRID", 0.005))
+ROUTE_TTL = int(environ.get("CACHE_ROUTE_TTL", 7 * 24 * 3600))
+ROUTE_GRID = float(environ.get("CACHE_ROUTE_GRID", 0.002))
+ROUTE_MAX = int(environ.get("CACHE_ROUTE_MAX", 100000))
+
+DATABASE_URL = environ.get("CACHE_DATABASE_URL", "sqlite:///cache.db")
+POOL_SIZE = int(environ.get("CACHE_POOL_SIZE", 5))
+SQLITE_PRAGMAS = {
+    "journal_mode": environ.get("CACHE_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": environ.get("CACHE_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": environ.get("CACHE_SQLITE_BUSY_TIMEOUT", "5000"),
+    "mmap_size": environ.get("CACHE_SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)),
+    "cache_size": environ.get("CACHE_SQLITE_CACHE_SIZE", "-16384")
+}
+
+
+def create_cache_engine(url):
+    ''' Creates the engine of the cache database
+        NOTE: SQLite connections are pooled and shared across threads, each one is tuned with SQLITE_PRAGMAS when it is opened
+        NOTE: no connection is opened until the first query, and pooled connections are never handed to a forked process,
+              so that every worker opens its own ones
+        NOTE: only SQLite is supported, since the cache relies on its upserts (INSERT OR REPLACE), VACUUM and migrations
+    '''
+    if not url.startswith("sqlite"):
+        raise ValueError("CACHE_DATABASE_URL must be a SQLite URL, got {}".format(url.split(":", 1)[0]))
+    engine = create_engine(url, convert_unicode=True, poolclass=QueuePool, pool_size=POOL_SIZE,
+                           connect_args={"check_same_thread": False})
+    
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute("PRAGMA {} = {}".format(pragma, value))
+        cursor.close()
+    
+    @event.listens_for(engine, "connect")
+    def record_pid(dbapi_connection, connection_record):
+        connection_record.info["pid"] = getpid()
+    
+    @event.listens_for(engine, "checkout")
+    def check_pid(dbapi_connection, connection_record, connection_proxy):
+        if connection_record.info.get("pid") != getpid():
+            connection_record.connection = connection_proxy.connection = None
+            raise exc.DisconnectionError("Connection opened by process {} checked out by process {}".format(connection_record.info.get("pid"), getpid()))
+    
+    return engine
+
+
+Engine = create_cache_engine(DATABASE_URL)
 Session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=Engine))
 Base = declarative_base()
 Base.query = Session.query_property()
 
 
-def start_db():
-    Base.metadata.create_all(bind=Engine)
+def start_db(engine=None):
+    ''' Creates the missing tables and migrates the schema of an already existing database
+        NOTE: migrations run inside an immediate transaction, so concurrent workers apply them only once
+        Arguments:
+            - engine (optional): engine of the database to start, the cache database if not provided
+    '''
+    from cache.Migrations import MIGRATIONS
+    engine = engine or Engine
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        connection.execute("BEGIN IMMEDIATE")
+        version = connection.execute("PRAGMA user_version").scalar()
+        if engine.dialect.has_table(connection, "CINEMAS"):
+            for migration in MIGRATIONS[version:]:
+                migration(connection)
+        Base.metadata.create_all(bind=connection)
+        connection.execute("PRAGMA user_version = {:d}".format(len(MIGRATIONS)))
+        transaction.commit()
 
 
 def clean_db():
     Session.remove()
-
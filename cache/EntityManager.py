@@ -1,83 +1,441 @@
-from cache.Configuration import Session, start_db
-from cache.models import Cinema, Showtimes
+from datetime import datetime, timedelta
+from math import asin, cos, floor, radians, sin, sqrt
+from threading import Lock, Thread
+from time import monotonic
+from common import TTLCache, metrics
+from sqlalchemy import func
+from sqlalchemy.orm import load_only
+from cache.Configuration import COMPACT_INTERVAL, COVERAGE_GRID, GRID_SIZE, OBJECT_CACHE_ENTRIES, OBJECT_CACHE_TTL, ROUTE_MAX, STALE_GRACE, Engine, Session, start_db
+from cache.models import Cinema, Coverage, Route, Showing, Showtimes, Snapshot
 
 
 class EntityManager():
     ''' Class for fetch/persist Cinema and Showtime entities from/into the database 
+    Decoded entities are kept in an in-memory LRU cache, invalidated on save and bounded by the row expiry and OBJECT_CACHE_TTL
+    Read methods give their connection back to the pool as soon as they return, so it is not held during the upstream requests
+    Expired entities are kept for STALE_GRACE seconds, so that they can be served as stale data when cinema-adapter is unavailable
     Exposed methods:
-        > existsCinema(): given a cinema ID, it checks if the related Cinema entity is persisted or not
-        > existsShowtimes(): given the pair (cinemaId,filmId), it checks if the related Showtimes entity is persisted or not
+        > cacheStats(): retrieves hit/miss counters of the in-memory caches of decoded entities
+        > compact(): deletes the entities expired for more than STALE_GRACE seconds and keeps at most ROUTE_MAX routes
+        > compactIfDue(): runs compact() in background if the compaction interval has elapsed
         > getCinema(): given a cinema ID, it fetches the related Cinema entity from the database
-        > getShowtime(): given the pair (cinemaId,filmId), it fetches the related Showtime entity from the database
+        > getCinemaExpiry(): given a cinema ID, it fetches the expiry of the related Cinema entity
+        > getNearbyCinemas(): given a GPS position and a radius, it fetches the closest Cinema entities from the database
+        > getRoute(): given a cinema ID and a GPS position, it fetches the route towards the cinema from the position snapped to the grid
+        > getShowingsExpiry(): given a cinema ID and a date, it fetches the earliest expiry of the related Showing entities
+        > getSnapshot(): given a cinema ID and a date, it fetches the whole showtimes payload stored for them, or its projection on the showings attributes
+        > getSnapshotDigest(): given a cinema ID and a date, it fetches the digest of the showtimes payload stored for them
+        > getShowtime(): given the pair (cinemaId,filmId) and optionally a date, it fetches the related Showtime entity and its showings from the database
+        > isCovered(): given a GPS position and a radius, it tells whether the cinemas of the whole disc have been fetched by upstream nearby searches not expired
         > saveCinema(): given an dictionary representation, it persists data as Cinema entity into the database
-        > saveShowtimes(): given an dictionary representation, it persists data as Showtimes entity into the database
+        > saveCinemas(): given a list of dictionary representations, it persists them as Cinema entities in a single transaction
+        > saveCoverage(): given a GPS position and the cinemas found around it by an upstream nearby search, it persists the covered cells as Coverage entities
+        > saveRoute(): given a cinema ID, a GPS position and the route between them, it persists the route as Route entity into the database
+        > saveShowtimesBatch(): given a list of dictionary representations and optionally the payload they come from, it persists them as Showtimes entities in a single transaction
+        > vacuum(): reclaims the unused space of the database file
     '''
     
     def __init__(self):
         ''' Constructor of the class '''
         start_db()
+        self.__compactLock = Lock()
+        self.__lastCompaction = monotonic()
+        self.__cinemas = TTLCache(OBJECT_CACHE_ENTRIES)
+        self.__showtimes = TTLCache(OBJECT_CACHE_ENTRIES)
+        self.__routes = TTLCache(OBJECT_CACHE_ENTRIES)
+        metrics.describe("cache_operation_duration_seconds", "Duration of the operations on the cache database")
+        metrics.collect(self.__collect)
     
     
-    def __existsCinema(self, cinemaId):
-        ''' Method for check if a cinema entity already exists
+    def cacheStats(self):
+        ''' Method for retrieve the counters of the in-memory caches
+            Returns: a dictionary containing hits, misses, hit ratio, evictions and entries of each cache
+        '''
+        return {"cinemas": self.__cinemas.stats(), "showtimes": self.__showtimes.stats(), "routes": self.__routes.stats()}
+    
+    
+    def __collect(self):
+        ''' Method providing the counters of the in-memory caches to the metrics scrapes '''
+        samples = []
+        for cache, stats in self.cacheStats().items():
+            samples.append(("cache_objects_hits_total", "counter", {"cache": cache}, stats.get("hits")))
+            samples.append(("cache_objects_misses_total", "counter", {"cache": cache}, stats.get("misses")))
+            samples.append(("cache_objects_entries", "gauge", {"cache": cache}, stats.get("entries")))
+        return samples
+    
+    
+    @metrics.timed("cache_operation_duration_seconds", operation="compact")
+    def compact(self):
+        ''' Method for deleting the entities expired for more than STALE_GRACE seconds and the oldest routes beyond ROUTE_MAX '''
+        horizon = self.__horizon(True)
+        for model in (Cinema, Coverage, Showtimes, Showing, Snapshot, Route):
+            Session.query(model).filter((model.expires_at == None) | (model.expires_at <= horizon)).delete(synchronize_session=False)
+        oldest = Session.query(Route.fetched_at).order_by(Route.fetched_at.desc()).offset(ROUTE_MAX).limit(1).scalar()
+        if oldest:
+            Session.query(Route).filter(Route.fetched_at <= oldest).delete(synchronize_session=False)
+        Session.commit()
+    
+    
+    def compactIfDue(self):
+        ''' Method for running the compaction in a background thread once every COMPACT_INTERVAL seconds '''
+        if monotonic() - self.__lastCompaction < COMPACT_INTERVAL or not self.__compactLock.acquire(False):
+            return
+        self.__lastCompaction = monotonic()
+        Thread(target=self.__compact_background, daemon=True).start()
+    
+    
+    def __compact_background(self):
+        ''' Method executed by the background compaction thread '''
+        try:
+            self.compact()
+        finally:
+            Session.remove()
+            self.__compactLock.release()
+    
+    
+    @metrics.timed("cache_operation_duration_seconds", operation="vacuum")
+    def vacuum(self):
+        ''' Method for reclaiming the unused space of the database file
+            NOTE: the database is locked for the whole rebuild, so it is run by the cache.Vacuum command rather than by the web workers
+        '''
+        with Engine.connect() as connection:
+            connection.execute("VACUUM")
+    
+    
+    def __horizon(self, stale):
+        ''' Method for computing the datetime after which an entity has to expire for being served
             Arguments:
-                - cinemaId: cinema identifier corresponding to the related table row
-            Returns: True if exists, otherwise False
+                - stale: boolean accepting the entities expired for less than STALE_GRACE seconds
+            Returns: the datetime (UTC)
         '''
-        return (Session.query(Cinema.cinema_id).filter(Cinema.cinema_id == cinemaId).scalar() is not None)
+        return datetime.utcnow() - timedelta(seconds=STALE_GRACE if stale else 0)
     
     
-    def __existsShowtimes(self, cinemaId, filmId):
-        ''' Method for check if a showtime entity already exists
+    def __fetch(self, cache, key, load):
+        ''' Method for fetching an entity through the in-memory cache
             Arguments:
-                - cinemaId: cinemaId identifier corresponding to the related table row
-                - filmId: filmId identifier corresponding to the related table row
-            Returns: True if exists, otherwise False
+                - cache: TTLCache holding the decoded entities
+                - key: identifier of the entity in the cache
+                - load: function returning the dictionary representation of the entity and its expiry, otherwise None (null object)
+            Returns: a copy of the dictionary representation of the entity, otherwise None (null object)
+        '''
+        result = cache.get(key)
+        if result is None:
+            try:
+                loaded = load()
+            finally:
+                Session.close()
+            if not loaded:
+                return None
+            result, expires = loaded
+            cache.put(key, result, min((expires - datetime.utcnow()).total_seconds(), OBJECT_CACHE_TTL))
+        return dict(result)
+    
+    
+    def __loadCinema(self, cinemaId, stale=False):
+        ''' Method for loading a not expired (or stale) Cinema entity from the database
+            Returns: the pair (dictionary representation, expiry), otherwise None (null object)
         '''
-        return (Session.query(Showtimes.id).filter(Showtimes.cinema_id == cinemaId, Showtimes.film_id == filmId).scalar() is not None)
+        cinema = Session.query(Cinema).filter(Cinema.cinema_id == cinemaId, Cinema.expires_at > self.__horizon(stale)).one_or_none()
+        if cinema:
+            return cinema.to_dict(), cinema.expires_at
     
-        
-    def getCinema(self, cinemaId):
+    
+    def __loadShowtimes(self, cinemaId, filmId, date):
+        ''' Method for loading a not expired Showtimes entity and the showings of a date from the database
+            NOTE: only the showings of the wanted date are read and decoded, the latest fetched ones if date is None
+            Returns: the pair (dictionary representation, expiry), otherwise None (null object)
+        '''
+        now = datetime.utcnow()
+        showtimes = Session.query(Showtimes).filter(Showtimes.cinema_id == cinemaId, Showtimes.film_id == filmId, Showtimes.expires_at > now).one_or_none()
+        if not showtimes:
+            return None
+        query = Session.query(Showing).filter(Showing.cinema_id == cinemaId, Showing.film_id == filmId, Showing.expires_at > now)
+        showing = (query.filter(Showing.date == date) if date else query.order_by(Showing.fetched_at.desc())).first()
+        if not showing:
+            return None
+        result = showtimes.to_dict()
+        result.update(showing.to_dict())
+        return result, min(showtimes.expires_at, showing.expires_at)
+    
+    
+    @metrics.timed("cache_operation_duration_seconds", operation="getCinema")
+    def getCinema(self, cinemaId, stale=False):
         ''' Method for fetching a Cinema entity from the database
             Arguments:
                 - cinemaId: cinema identifier corresponding to the related table row
-            Returns: a dictionary representation of the Cinema entity
+                - stale (optional): boolean accepting an entity expired for less than STALE_GRACE seconds
+            Returns: a dictionary representation of the Cinema entity if it exists and it is not expired
         '''
-        cinema = Session.query(Cinema).filter(Cinema.cinema_id == cinemaId).one_or_none()
-        if cinema:
-            return cinema.to_dict()
+        return self.__fetch(self.__cinemas, cinemaId, lambda: self.__loadCinema(cinemaId, stale))
+    
+    
+    @metrics.timed("cache_operation_duration_seconds", operation="getCinemaExpiry")
+    def getCinemaExpiry(self, cinemaId):
+        ''' Method for fetching the expiry of a Cinema entity
+            Arguments:
+                - cinemaId: cinema identifier corresponding to the related table row
+            Returns: the expiry datetime (UTC), otherwise None (null object) if the entity does not exist
+        '''
+        try:
+            return Session.query(Cinema.expires_at).filter(Cinema.cinema_id == cinemaId).scalar()
+        finally:
+            Session.close()
+    
+    
+    @metrics.timed("cache_operation_duration_seconds", operation="getRoute")
+    def getRoute(self, cinemaId, position, stale=False):
+        ''' Method for fetching the route towards a cinema from a GPS position
+            NOTE: routes are shared by all the positions snapped to the same point of the grid
+            Arguments:
+                - cinemaId: cinema identifier corresponding to the related table row
+                - position: string containing the GPS position in "float(x);float(y)" format
+                - stale (optional): boolean accepting a route expired for less than STALE_GRACE seconds
+            Returns: a dictionary representation of the route if it exists and it is not expired, otherwise None (null object)
+        '''
+        origin = Route.origin_of(position)
+        if origin:
+            return self.__fetch(self.__routes, (cinemaId, origin), lambda: self.__loadRoute(cinemaId, origin, stale))
+    
+    
+    def __loadRoute(self, cinemaId, origin, stale=False):
+        ''' Method for loading a not expired (or stale) Route entity from the database
+            Returns: the pair (dictionary representation, expiry), otherwise None (null object)
+        '''
+        route = Session.query(Route).filter(Route.cinema_id == cinemaId, Route.origin == origin, Route.expires_at > self.__horizon(stale)).one_or_none()
+        if route:
+            return route.to_dict(), route.expires_at
+    
+    
+    @metrics.timed("cache_operation_duration_seconds", operation="getShowingsExpiry")
+    def getShowingsExpiry(self, cinemaId, date):
+        ''' Method for fetching the earliest expiry of the Showing entities of a cinema in a date
+            Arguments:
+                - cinemaId: cinema identifier corresponding to the related table rows
+                - date: string containing the date in YYYY-MM-DD format
+            Returns: the expiry datetime (UTC), otherwise None (null object) if there are no entities
+        '''
+        try:
+            return Session.query(func.min(Showing.expires_at)).filter(Showing.cinema_id == cinemaId, Showing.date == date).scalar()
+        finally:
+            Session.close()
     
     
-    def getShowtimes(self, cinemaId, filmId):
+    def __distance(self, lat, lng, otherLat, otherLng):
+        ''' Method for computing the great-circle distance in kilometers between two GPS positions '''
+        return 12742 * asin(sqrt(sin(radians(otherLat - lat) / 2) ** 2 + cos(radians(lat)) * cos(radians(otherLat)) * sin(radians(otherLng - lng) / 2) ** 2))
+    
+    
+    def __coverageCells(self, lat, lng, radius, inside):
+        ''' Method for listing the cells of the coverage grid around a disc
+            Arguments:
+                - lat, lng: pair of floats containing the GPS position of the center
+                - radius: float representing the radius in kilometers
+                - inside: boolean listing the cells lying entirely inside the disc, otherwise the ones overlapping it
+            Returns: list of (row, column) pairs of the cells
+        '''
+        latSpan = radius / 111.32
+        lngSpan = radius / (111.32 * max(cos(radians(lat)), 0.01))
+        cells = []
+        for row in range(floor((lat - latSpan) / COVERAGE_GRID), floor((lat + latSpan) / COVERAGE_GRID) + 1):
+            for column in range(floor((lng - lngSpan) / COVERAGE_GRID), floor((lng + lngSpan) / COVERAGE_GRID) + 1):
+                south, west = row * COVERAGE_GRID, column * COVERAGE_GRID
+                north, east = south + COVERAGE_GRID, west + COVERAGE_GRID
+                if inside:
+                    distance = max(self.__distance(lat, lng, cornerLat, cornerLng) for cornerLat in (south, north) for cornerLng in (west, east))
+                    if distance < radius:
+                        cells.append((row, column))
+                elif self.__distance(lat, lng, min(max(lat, south), north), min(max(lng, west), east)) <= radius:
+                    cells.append((row, column))
+        return cells
+    
+    
+    @metrics.timed("cache_operation_duration_seconds", operation="isCovered")
+    def isCovered(self, lat, lng, radius):
+        ''' Method for checking whether all the cinemas within a radius from a position are cached
+            NOTE: the disc must lie inside cells of the coverage grid recorded by upstream nearby searches and not expired
+            Arguments:
+                - lat, lng: pair of floats containing the GPS position
+                - radius: float representing the distance in kilometers
+            Returns: True if every cell overlapping the disc is covered, otherwise False
+        '''
+        cells = self.__coverageCells(lat, lng, radius, False)
+        rows, columns = [row for row, _ in cells], [column for _, column in cells]
+        try:
+            query = Session.query(Coverage.lat_cell, Coverage.lng_cell).filter(Coverage.lat_cell.between(min(rows), max(rows)),
+                                                                               Coverage.lng_cell.between(min(columns), max(columns)),
+                                                                               Coverage.expires_at > datetime.utcnow())
+            return set(cells) <= set(query)
+        finally:
+            Session.close()
+    
+    
+    @metrics.timed("cache_operation_duration_seconds", operation="getNearbyCinemas")
+    def getNearbyCinemas(self, lat, lng, radius, n=None, stale=False):
+        ''' Method for fetching the Cinema entities within a radius from a position, sorted by distance
+            NOTE: only the rows of the grid cells overlapping the radius are read, through the index on the cell column
+            Arguments:
+                - lat, lng: pair of floats containing the GPS position
+                - radius: float representing the maximum distance in kilometers
+                - n (optional): integer representing the maximum number of entities to fetch
+                - stale (optional): boolean accepting the entities expired for less than STALE_GRACE seconds
+            Returns: list of dictionaries containing cinema_id, cinema_name and distance (in kilometers) of each cinema
+        '''
+        latSpan = radius / 111.32
+        lngSpan = radius / (111.32 * max(cos(radians(lat)), 0.01))
+        rows = range(floor((lat - latSpan) / GRID_SIZE), floor((lat + latSpan) / GRID_SIZE) + 1)
+        columns = range(floor((lng - lngSpan) / GRID_SIZE), floor((lng + lngSpan) / GRID_SIZE) + 1)
+        cells = ["{:d}:{:d}".format(row, column) for row in rows for column in columns]
+        query = Session.query(Cinema.cinema_id, Cinema.cinema_name, Cinema.lat, Cinema.lng).filter(Cinema.cell.in_(cells), Cinema.expires_at > self.__horizon(stale))
+        cinemas = []
+        for cinemaId, name, cinemaLat, cinemaLng in query:
+            distance = self.__distance(lat, lng, cinemaLat, cinemaLng)
+            if distance <= radius:
+                cinemas.append({"cinema_id": cinemaId, "cinema_name": name, "distance": distance})
+        Session.close()
+        cinemas.sort(key=lambda cinema: cinema.get("distance"))
+        return cinemas[:n] if n else cinemas
+    
+    
+    @metrics.timed("cache_operation_duration_seconds", operation="getSnapshot")
+    def getSnapshot(self, cinemaId, date, stale=False, projected=False):
+        ''' Method for fetching the showtimes payload stored for a cinema in a date
+            NOTE: only the wanted column between payload and projection is read and decoded
+            Arguments:
+                - cinemaId: cinema identifier corresponding to the related table row
+                - date: string containing the date in YYYY-MM-DD format
+                - stale (optional): boolean accepting a payload expired for less than STALE_GRACE seconds
+                - projected (optional): boolean fetching the projection stored with the payload instead of the payload
+            Returns: the payload if it exists and it is not expired, otherwise None (null object)
+        '''
+        try:
+            snapshot = Session.query(Snapshot).options(load_only("projection" if projected else "payload")).filter(Snapshot.cinema_id == cinemaId, Snapshot.date == date, Snapshot.expires_at > self.__horizon(stale)).one_or_none()
+            if snapshot:
+                return snapshot.to_dict(projected)
+        finally:
+            Session.close()
+    
+    
+    @metrics.timed("cache_operation_duration_seconds", operation="getSnapshotDigest")
+    def getSnapshotDigest(self, cinemaId, date):
+        ''' Method for fetching the digest of the showtimes payload stored for a cinema in a date
+            NOTE: neither the payload nor its projection is read
+            Arguments:
+                - cinemaId: cinema identifier corresponding to the related table row
+                - date: string containing the date in YYYY-MM-DD format
+            Returns: the SHA-1 digest of the payload if it exists and it is not expired, otherwise None (null object)
+        '''
+        try:
+            return Session.query(Snapshot.digest).filter(Snapshot.cinema_id == cinemaId, Snapshot.date == date, Snapshot.expires_at > self.__horizon(False)).scalar()
+        finally:
+            Session.close()
+    
+    
+    @metrics.timed("cache_operation_duration_seconds", operation="getShowtimes")
+    def getShowtimes(self, cinemaId, filmId, date=None):
         ''' Method for fetching a Showtimes entity from the database
-            NOTE: The pair (cinemaId,filmId) is the primary key for Showtime entities
+            NOTE: The pair (cinemaId,filmId) is the unique key for Showtime entities
             Arguments:
                 - cinemaId: cinema identifier corresponding to the related table row
                 - filmId: film identifier corresponding to the related table row
-            Returns: a dictionary representation of the Showtimes entity
+                - date (optional): string containing the date of the showings in YYYY-MM-DD format, the latest fetched date if not provided
+            Returns: a dictionary representation of the Showtimes entity, with the showings of the date, if it exists and it is not expired
+        '''
+        return self.__fetch(self.__showtimes, (cinemaId, filmId, date), lambda: self.__loadShowtimes(cinemaId, filmId, date))
+    
+    
+    def __rows(self, model, objs):
+        ''' Method for converting object representations into table rows
+            Arguments:
+                - model: entity class the objects belong to
+                - objs: list of object representations of the entities
+            Returns: list of dictionaries mapping column names to values
         '''
-        showtimes = Session.query(Showtimes).filter(Showtimes.cinema_id == cinemaId, Showtimes.film_id == filmId).one_or_none()
-        if showtimes:
-            return showtimes.to_dict()
+        columns = [c.name for c in model.__table__.columns if not (c.primary_key and c.autoincrement is True)]
+        rows = [model(obj) for obj in objs]
+        return [{c: getattr(row, c) for c in columns} for row in rows]
     
     
     def saveCinema(self, obj):
         ''' Method for pesist a Cinema entity into the database
+            NOTE: an already persisted Cinema entity is updated
             Arguments:
                 - obj: object representation of the Cinema entity
         '''
-        cinema = Cinema(obj)
-        if not self.__existsCinema(cinema.cinema_id):
-            Session.add(cinema)
+        self.saveCinemas([obj])
+    
+    
+    @metrics.timed("cache_operation_duration_seconds", operation="saveCinemas")
+    def saveCinemas(self, objs):
+        ''' Method for pesist several Cinema entities into the database with a single transaction
+            NOTE: already persisted Cinema entities are updated
+            Arguments:
+                - objs: list of object representations of the Cinema entities
+        '''
+        rows = self.__rows(Cinema, objs)
+        if rows:
+            Session.execute(Cinema.__table__.insert().prefix_with("OR REPLACE"), rows)
+            Session.commit()
+            for row in rows:
+                self.__cinemas.invalidate(row.get("cinema_id"))
+    
+    
+    @metrics.timed("cache_operation_duration_seconds", operation="saveCoverage")
+    def saveCoverage(self, position, cinemas, missing=()):
+        ''' Method for pesist the cells of the coverage grid whose cinemas have all been fetched by an upstream nearby search
+            NOTE: the search is assumed to return the nearest cinemas, so the cells inside the disc reaching the farthest of them are covered,
+                  or only the ones closer than the nearest missing cinema, if any
+            Arguments:
+                - position: string containing the GPS position of the search in "float(x);float(y)" format
+                - cinemas: list of maps containing "lat" and "lng" of each cinema returned by the search
+                - missing (optional): list of the cinemas returned by the search but not persisted
+        '''
+        try:
+            lat, lng = (float(v) for v in position.split(";"))
+            distances = [self.__distance(lat, lng, float(c.get("lat")), float(c.get("lng"))) for c in missing or cinemas]
+        except (AttributeError, TypeError, ValueError):
+            return
+        if distances:
+            radius = min(distances) if missing else max(distances)
+            rows = self.__rows(Coverage, [{"lat_cell": row, "lng_cell": column} for row, column in self.__coverageCells(lat, lng, radius, True)])
+            if rows:
+                Session.execute(Coverage.__table__.insert().prefix_with("OR REPLACE"), rows)
+                Session.commit()
+    
+    
+    @metrics.timed("cache_operation_duration_seconds", operation="saveRoute")
+    def saveRoute(self, cinemaId, position, route):
+        ''' Method for pesist a Route entity into the database
+            NOTE: an already persisted Route entity is updated
+            Arguments:
+                - cinemaId: cinema identifier
+                - position: string containing the GPS position in "float(x);float(y)" format
+                - route: map of the route attributes returned by the adapter
+        '''
+        origin = Route.origin_of(position)
+        if origin:
+            Session.execute(Route.__table__.insert().prefix_with("OR REPLACE"), self.__rows(Route, [{"cinema_id": cinemaId, "origin": origin, "route": route}]))
             Session.commit()
+            self.__routes.invalidate((cinemaId, origin))
     
     
-    def saveShowtimes(self, obj):
-        ''' Method for pesist a Showtime entity into the database
+    @metrics.timed("cache_operation_duration_seconds", operation="saveShowtimesBatch")
+    def saveShowtimesBatch(self, objs, snapshot=None):
+        ''' Method for pesist several Showtimes entities into the database with a single transaction
+            NOTE: already persisted Showtimes entities, identified by the pair (cinemaId,filmId), are updated
+            NOTE: the showings of each object are persisted as Showing entity of the object date
             Arguments:
-                - obj: object representation of the Showtime entity
+                - objs: list of object representations of the Showtimes entities, each one with its "date"
+                - snapshot (optional): map containing "cinema_id", "date", the whole "payload" the objects come from and its "projection"
         '''
-        showtimes = Showtimes(obj)
-        if not self.__existsShowtimes(showtimes.cinema_id, showtimes.film_id):
-            Session.add(showtimes)
+        rows = self.__rows(Showtimes, objs)
+        if rows:
+            Session.execute(Showtimes.__table__.insert().prefix_with("OR REPLACE"), rows)
+            Session.execute(Showing.__table__.insert().prefix_with("OR REPLACE"), self.__rows(Showing, objs))
+        if snapshot:
+            Session.execute(Snapshot.__table__.insert().prefix_with("OR REPLACE"), self.__rows(Snapshot, [snapshot]))
+        if rows or snapshot:
             Session.commit()
+            for obj in objs:
+                self.__showtimes.invalidate((obj.get("cinema_id"), obj.get("film_id"), obj.get("date")))
+                self.__showtimes.invalidate((obj.get("cinema_id"), obj.get("film_id"), None))
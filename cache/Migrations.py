@@ -0,0 +1,90 @@
+''' Schema migrations for already existing cache databases
+    Each migration is a function receiving an open connection and it is applied at most once:
+    the index of the last applied migration is stored as the database user_version.
+    NOTE: new migrations must be appended to MIGRATIONS, never inserted or reordered
+'''
+
+
+def add_expiry_columns(connection):
+    ''' Adds fetched_at/expires_at columns to CINEMAS and SHOWTIMES, rows without them are treated as expired '''
+    for table in ("CINEMAS", "SHOWTIMES"):
+        connection.execute("ALTER TABLE {} ADD COLUMN fetched_at DATETIME".format(table))
+        connection.execute("ALTER TABLE {} ADD COLUMN expires_at DATETIME".format(table))
+        connection.execute("CREATE INDEX ix_{0}_expires_at ON {0} (expires_at)".format(table))
+
+
+def add_showtimes_unique_index(connection):
+    ''' Removes duplicated (cinema_id, film_id) rows from SHOWTIMES, keeping the latest one, and adds the unique index on the pair '''
+    connection.execute("DELETE FROM SHOWTIMES WHERE id NOT IN (SELECT MAX(id) FROM SHOWTIMES GROUP BY cinema_id, film_id)")
+    connection.execute("CREATE UNIQUE INDEX ux_SHOWTIMES_cinema_film ON SHOWTIMES (cinema_id, film_id)")
+
+
+def move_showings_out_of_showtimes(connection):
+    ''' Rebuilds SHOWTIMES without the showings column, which is replaced by the per-date rows of SHOWINGS
+        NOTE: the old showings carry no date, so they are dropped and fetched again on the next request
+    '''
+    connection.execute("""CREATE TABLE SHOWTIMES_new (
+        id INTEGER NOT NULL,
+        cinema_id VARCHAR(12) NOT NULL,
+        film_id VARCHAR(12) NOT NULL,
+        film_name VARCHAR(128) NOT NULL,
+        show_dates TEXT NOT NULL,
+        fetched_at DATETIME,
+        expires_at DATETIME,
+        PRIMARY KEY (id)
+    )""")
+    connection.execute("""INSERT INTO SHOWTIMES_new (id, cinema_id, film_id, film_name, show_dates, fetched_at, expires_at)
+        SELECT id, cinema_id, film_id, film_name, show_dates, fetched_at, expires_at FROM SHOWTIMES""")
+    connection.execute("DROP TABLE SHOWTIMES")
+    connection.execute("ALTER TABLE SHOWTIMES_new RENAME TO SHOWTIMES")
+    connection.execute("CREATE INDEX ix_SHOWTIMES_expires_at ON SHOWTIMES (expires_at)")
+    connection.execute("CREATE UNIQUE INDEX ux_SHOWTIMES_cinema_film ON SHOWTIMES (cinema_id, film_id)")
+
+
+def add_cinemas_grid_cell(connection):
+    ''' Rebuilds CINEMAS with numeric coordinates and the indexed grid cell used by nearby queries '''
+    from cache.models import Cinema
+    connection.execute("""CREATE TABLE CINEMAS_new (
+        cinema_id VARCHAR(12) NOT NULL,
+        cinema_name VARCHAR(30) NOT NULL,
+        address VARCHAR(30) NOT NULL,
+        city VARCHAR(30) NOT NULL,
+        lat FLOAT NOT NULL,
+        lng FLOAT NOT NULL,
+        cell VARCHAR(24),
+        contact TEXT,
+        url TEXT,
+        hours TEXT,
+        fetched_at DATETIME,
+        expires_at DATETIME,
+        PRIMARY KEY (cinema_id)
+    )""")
+    connection.execute("""INSERT INTO CINEMAS_new (cinema_id, cinema_name, address, city, lat, lng, contact, url, hours, fetched_at, expires_at)
+        SELECT cinema_id, cinema_name, address, city, CAST(lat AS REAL), CAST(lng AS REAL), contact, url, hours, fetched_at, expires_at FROM CINEMAS""")
+    connection.execute("DROP TABLE CINEMAS")
+    connection.execute("ALTER TABLE CINEMAS_new RENAME TO CINEMAS")
+    connection.execute("CREATE INDEX ix_CINEMAS_expires_at ON CINEMAS (expires_at)")
+    connection.execute("CREATE INDEX ix_CINEMAS_cell ON CINEMAS (cell)")
+    for cinemaId, lat, lng in connection.execute("SELECT cinema_id, lat, lng FROM CINEMAS").fetchall():
+        connection.execute("UPDATE CINEMAS SET cell = ? WHERE cinema_id = ?", (Cinema.cell_of(lat, lng), cinemaId))
+
+
+def add_snapshots_projection(connection):
+    ''' Drops SNAPSHOTS, which is created again with the projection column: stored payloads are fetched again on the next request '''
+    connection.execute("DROP TABLE IF EXISTS SNAPSHOTS")
+
+
+def add_snapshots_digest(connection):
+    ''' Adds the digest column to SNAPSHOTS, the ETag of the stored payloads is precomputed once they are fetched again '''
+    if connection.dialect.has_table(connection, "SNAPSHOTS"):
+        connection.execute("ALTER TABLE SNAPSHOTS ADD COLUMN digest VARCHAR(40)")
+
+
+MIGRATIONS = [
+    add_expiry_columns,
+    add_showtimes_unique_index,
+    move_showings_out_of_showtimes,
+    add_cinemas_grid_cell,
+    add_snapshots_projection,
+    add_snapshots_digest
+]
@@ -0,0 +1,13 @@
+''' Maintenance command compacting the cache database and reclaiming its unused space
+    Usage: python -m cache.Vacuum
+    It is meant to be scheduled off-peak (e.g. by cron or Heroku Scheduler), since VACUUM locks the database file for all the workers.
+'''
+from time import perf_counter
+from cache import cache_service
+
+
+if __name__ == "__main__":
+    start = perf_counter()
+    cache_service.compact()
+    cache_service.vacuum()
+    print("Compacted the cache database in {:.1f}s".format(perf_counter() - start))
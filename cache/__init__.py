@@ -1,4 +1,5 @@
 from cache.Configuration import clean_db
 from cache.EntityManager import EntityManager
+from common import Lazy
 
-cache_service = EntityManager()
+cache_service = Lazy(EntityManager)
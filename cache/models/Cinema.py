@@ -1,6 +1,9 @@
-from sqlalchemy import Column, String
-from cache.Configuration import Base
+from sqlalchemy import Column, DateTime, Float, String, Text
+from cache.Configuration import Base, CINEMA_TTL, GRID_SIZE
+from datetime import datetime, timedelta
 from json import dumps, loads
+from common import metrics
+from math import floor
 
 
 ''' Model for Cinema entities '''
@@ -11,22 +14,28 @@ class Cinema(Base):
             - cinema_name varchar(30)
             - address varchar(30)
             - city varchar(30)
-            - lat varchar(12)
-            - lng varchar(12)
-            - contact varchar(256)
-            - url varchar(128)
-            - hours varchar(256)
+            - lat float
+            - lng float
+            - cell varchar(24) indexed, grid cell of GRID_SIZE degrees containing the cinema
+            - contact text (compact JSON)
+            - url text (compact JSON)
+            - hours text (compact JSON)
+            - fetched_at datetime
+            - expires_at datetime indexed
     '''
     __tablename__ = "CINEMAS"
     cinema_id = Column(String(12), primary_key=True)
     cinema_name = Column(String(30), nullable=False)
     address = Column(String(30), nullable=False)
     city = Column(String(30), nullable=False)
-    lat = Column(String(12), nullable=False)
-    lng = Column(String(12), nullable=False)
-    contact = Column(String(256), nullable=True)
-    url = Column(String(128), nullable=True)
-    hours = Column(String(256), nullable=True)
+    lat = Column(Float, nullable=False)
+    lng = Column(Float, nullable=False)
+    cell = Column(String(24), nullable=True, index=True)
+    contact = Column(Text, nullable=True)
+    url = Column(Text, nullable=True)
+    hours = Column(Text, nullable=True)
+    fetched_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
     
     def __init__(self, obj):
         ''' Constructor of the class
@@ -37,12 +46,21 @@ class Cinema(Base):
         self.cinema_name = obj.get("cinema_name")
         self.address = obj.get("address")
         self.city = obj.get("city")
-        self.lat = obj.get("lat")
-        self.lng = obj.get("lng")
-        self.contact = dumps(obj.get("contact"))
-        self.url = dumps(obj.get("url"))
-        self.hours = dumps(obj.get("hours"))
+        self.lat = float(obj.get("lat")) if obj.get("lat") is not None else None
+        self.lng = float(obj.get("lng")) if obj.get("lng") is not None else None
+        self.cell = Cinema.cell_of(self.lat, self.lng) if None not in (self.lat, self.lng) else None
+        self.contact = dumps(obj.get("contact"), separators=(",", ":"))
+        self.url = dumps(obj.get("url"), separators=(",", ":"))
+        self.hours = dumps(obj.get("hours"), separators=(",", ":"))
+        self.fetched_at = datetime.utcnow()
+        self.expires_at = self.fetched_at + timedelta(seconds=CINEMA_TTL)
     
+    @staticmethod
+    def cell_of(lat, lng):
+        ''' Returns the identifier of the grid cell containing the given position, in "row:column" format '''
+        return "{:d}:{:d}".format(floor(lat / GRID_SIZE), floor(lng / GRID_SIZE))
+    
+    @metrics.timed("cache_decode_duration_seconds", entity="Cinema")
     def to_dict(self):
         return {
             "cinema_id": self.cinema_id,
@@ -55,4 +73,3 @@ class Cinema(Base):
             "url": loads(self.url),
             "hours": loads(self.hours)
         }
-
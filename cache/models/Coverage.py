@@ -0,0 +1,30 @@
+from sqlalchemy import Column, DateTime, Integer
+from cache.Configuration import Base, CINEMA_TTL
+from datetime import datetime, timedelta
+
+
+
+''' Model for Coverage entities '''
+class Coverage(Base):
+    ''' Coverage object mapped to COVERAGE table, it marks a cell of the coverage grid whose cinemas have all been fetched by an upstream nearby search
+        Attributes/Columns:
+            - lat_cell integer primary_key, row of the cell in a grid of COVERAGE_GRID degrees
+            - lng_cell integer primary_key, column of the cell in a grid of COVERAGE_GRID degrees
+            - fetched_at datetime
+            - expires_at datetime indexed
+    '''
+    __tablename__ = "COVERAGE"
+    lat_cell = Column(Integer, primary_key=True, autoincrement=False)
+    lng_cell = Column(Integer, primary_key=True, autoincrement=False)
+    fetched_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
+    
+    def __init__(self, obj):
+        ''' Constructor of the class
+            Arguments:
+                - obj: map of coverage attributes
+        '''
+        self.lat_cell = obj.get("lat_cell")
+        self.lng_cell = obj.get("lng_cell")
+        self.fetched_at = datetime.utcnow()
+        self.expires_at = self.fetched_at + timedelta(seconds=CINEMA_TTL)
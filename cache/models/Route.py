@@ -0,0 +1,48 @@
+from sqlalchemy import Column, DateTime, String, Text
+from cache.Configuration import Base, ROUTE_GRID, ROUTE_TTL
+from datetime import datetime, timedelta
+from json import dumps, loads
+from common import metrics
+
+
+
+''' Model for Route entities '''
+class Route(Base):
+    ''' Route object mapped to ROUTES table, it holds the map and route URLs towards a cinema from an origin snapped to a grid
+        Attributes/Columns:
+            - cinema_id varchar(12) primary_key
+            - origin varchar(32) primary_key, GPS position snapped to a grid of ROUTE_GRID degrees
+            - route text (compact JSON)
+            - fetched_at datetime indexed
+            - expires_at datetime indexed
+    '''
+    __tablename__ = "ROUTES"
+    cinema_id = Column(String(12), primary_key=True)
+    origin = Column(String(32), primary_key=True)
+    route = Column(Text, nullable=False)
+    fetched_at = Column(DateTime, nullable=True, index=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
+    
+    def __init__(self, obj):
+        ''' Constructor of the class
+            Arguments:
+                - obj: map of route attributes
+        '''
+        self.cinema_id = obj.get("cinema_id")
+        self.origin = obj.get("origin")
+        self.route = dumps(obj.get("route"), separators=(",", ":"))
+        self.fetched_at = datetime.utcnow()
+        self.expires_at = self.fetched_at + timedelta(seconds=ROUTE_TTL)
+    
+    @staticmethod
+    def origin_of(position):
+        ''' Returns the given "float(x);float(y)" position snapped to the grid, otherwise None (null object) if it is not well formed '''
+        try:
+            lat, lng = (float(v) for v in position.split(";"))
+        except (AttributeError, ValueError):
+            return None
+        return "{:.5f};{:.5f}".format(round(lat / ROUTE_GRID) * ROUTE_GRID, round(lng / ROUTE_GRID) * ROUTE_GRID)
+    
+    @metrics.timed("cache_decode_duration_seconds", entity="Route")
+    def to_dict(self):
+        return loads(self.route)
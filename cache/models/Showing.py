@@ -0,0 +1,45 @@
+from sqlalchemy import Column, DateTime, String, Text
+from cache.Configuration import Base, SHOWTIMES_TTL
+from datetime import datetime, timedelta
+from json import dumps, loads
+from common import metrics
+
+
+
+''' Model for Showing entities '''
+class Showing(Base):
+    ''' Showing object mapped to SHOWINGS table, it holds the showings of a film in a cinema for a single date
+        Attributes/Columns:
+            - cinema_id varchar(12) primary_key
+            - film_id varchar(12) primary_key
+            - date varchar(10) primary_key
+            - showings text (compact JSON)
+            - fetched_at datetime
+            - expires_at datetime indexed
+    '''
+    __tablename__ = "SHOWINGS"
+    cinema_id = Column(String(12), primary_key=True)
+    film_id = Column(String(12), primary_key=True)
+    date = Column(String(10), primary_key=True)
+    showings = Column(Text, nullable=False)
+    fetched_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
+    
+    def __init__(self, obj):
+        ''' Constructor of the class
+            Arguments:
+                - obj: map of showing attributes
+        '''
+        self.cinema_id = obj.get("cinema_id")
+        self.film_id = obj.get("film_id")
+        self.date = obj.get("date")
+        self.showings = dumps(obj.get("showings"), separators=(",", ":"))
+        self.fetched_at = datetime.utcnow()
+        self.expires_at = self.fetched_at + timedelta(seconds=SHOWTIMES_TTL)
+    
+    @metrics.timed("cache_decode_duration_seconds", entity="Showing")
+    def to_dict(self):
+        return {
+            "date": self.date,
+            "showings": loads(self.showings)
+        }
@@ -1,27 +1,35 @@
-from sqlalchemy import Column, Integer, String
-from cache.Configuration import Base
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+from cache.Configuration import Base, SHOWTIMES_TTL
+from datetime import datetime, timedelta
 from json import dumps, loads
+from common import metrics
 
 
 
 ''' Model for Showtimes entities '''
 class Showtimes(Base):
     ''' Showtimes object mapped to SHOWTIMES table
+        NOTE: the showings of each date are stored as Showing entities into the SHOWINGS table
         Attributes/Columns:
             - id integer primary_key
             - cinema_id varchar(12)
             - film_id varchar(12)
             - film_name varchar(128)
-            - showings varchar(1024)
-            - show_dates varchar(1024)
+            - show_dates text (compact JSON)
+            - fetched_at datetime
+            - expires_at datetime indexed
+        Indexes:
+            - ux_SHOWTIMES_cinema_film unique (cinema_id, film_id)
     '''
     __tablename__ = "SHOWTIMES"
+    __table_args__ = (Index("ux_SHOWTIMES_cinema_film", "cinema_id", "film_id", unique=True),)
     id = Column(Integer, primary_key=True, autoincrement=True)
     cinema_id = Column(String(12), nullable=False)
     film_id = Column(String(12), nullable=False)
     film_name = Column(String(128), nullable=False)
-    showings = Column(String(1024), nullable=False)
-    show_dates = Column(String(1024), nullable=False)
+    show_dates = Column(Text, nullable=False)
+    fetched_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
     
     def __init__(self, obj):
         ''' Constructor of the class
@@ -31,15 +39,15 @@ class Showtimes(Base):
         self.cinema_id = obj.get("cinema_id")
         self.film_id = obj.get("film_id")
         self.film_name = obj.get("film_name")
-        self.showings = dumps(obj.get("showings"))
-        self.show_dates = dumps(obj.get("show_dates"))
+        self.show_dates = dumps(obj.get("show_dates"), separators=(",", ":"))
+        self.fetched_at = datetime.utcnow()
+        self.expires_at = self.fetched_at + timedelta(seconds=SHOWTIMES_TTL)
     
+    @metrics.timed("cache_decode_duration_seconds", entity="Showtimes")
     def to_dict(self):
         return {
             "cinema_id": self.cinema_id,
             "film_id": self.film_id,
             "film_name": self.film_name,
-            "showings": loads(self.showings),
             "show_dates": loads(self.show_dates)
         }
-
@@ -0,0 +1,46 @@
+from sqlalchemy import Column, DateTime, String, Text
+from cache.Configuration import Base, SHOWTIMES_TTL
+from datetime import datetime, timedelta
+from hashlib import sha1
+from json import dumps, loads
+from common import metrics
+
+
+
+''' Model for Snapshot entities '''
+class Snapshot(Base):
+    ''' Snapshot object mapped to SNAPSHOTS table, it holds the whole showtimes payload fetched for a cinema in a date
+        Attributes/Columns:
+            - cinema_id varchar(12) primary_key
+            - date varchar(10) primary_key
+            - payload text (compact JSON)
+            - projection text (compact JSON), films of the payload with the attributes exposed by showings only
+            - digest varchar(40), SHA-1 of the payload identifying its version, used as ETag of the responses built upon it
+            - fetched_at datetime
+            - expires_at datetime indexed
+    '''
+    __tablename__ = "SNAPSHOTS"
+    cinema_id = Column(String(12), primary_key=True)
+    date = Column(String(10), primary_key=True)
+    payload = Column(Text, nullable=False)
+    projection = Column(Text, nullable=False)
+    digest = Column(String(40), nullable=True)
+    fetched_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
+    
+    def __init__(self, obj):
+        ''' Constructor of the class
+            Arguments:
+                - obj: map of snapshot attributes
+        '''
+        self.cinema_id = obj.get("cinema_id")
+        self.date = obj.get("date")
+        self.payload = dumps(obj.get("payload"), separators=(",", ":"))
+        self.projection = dumps(obj.get("projection"), separators=(",", ":"))
+        self.digest = sha1(self.payload.encode()).hexdigest()
+        self.fetched_at = datetime.utcnow()
+        self.expires_at = self.fetched_at + timedelta(seconds=SHOWTIMES_TTL)
+    
+    @metrics.timed("cache_decode_duration_seconds", entity="Snapshot")
+    def to_dict(self, projected=False):
+        return loads(self.projection if projected else self.payload)
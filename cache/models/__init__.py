@@ -1,3 +1,6 @@
 from cache.models.Cinema import Cinema
+from cache.models.Coverage import Coverage
+from cache.models.Route import Route
+from cache.models.Showing import Showing
 from cache.models.Showtimes import Showtimes
-
+from cache.models.Snapshot import Snapshot
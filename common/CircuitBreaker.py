@@ -0,0 +1,68 @@
+from threading import Lock
+from time import monotonic
+
+
+class CircuitBreaker():
+    ''' This class implements a thread-safe circuit breaker, which stops the calls towards a failing dependency
+        After threshold consecutive failures the breaker opens and rejects the calls for reset seconds, then it is half-open:
+        the next call is let through as trial, and its outcome closes the breaker or opens it again
+        Exposed methods:
+            > allow(): tells whether a call can be performed, letting a trial call through once the breaker is half-open
+            > success(): records a successful call, closing the breaker
+            > failure(): records a failed call, opening the breaker after threshold consecutive failures or a failed trial
+            > isOpen(): tells whether the breaker is open or half-open
+    '''
+    
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+    
+    def __init__(self, threshold, reset):
+        ''' Constructor of the class
+            Arguments:
+                - threshold: integer representing the number of consecutive failures opening the breaker
+                - reset: number of seconds the breaker stays open before letting a trial call through
+        '''
+        self.__threshold = threshold
+        self.__reset = reset
+        self.__failures = 0
+        self.__state = self.CLOSED
+        self.__since = 0
+        self.__lock = Lock()
+    
+    
+    def allow(self):
+        ''' Method for checking whether a call can be performed
+            NOTE: once reset seconds have elapsed, a single caller is let through as trial and it must record the outcome of its call,
+                  another trial is let through if it does not within reset seconds
+            Returns: True if the breaker is closed or the caller is the trial, otherwise False
+        '''
+        with self.__lock:
+            if self.__state == self.CLOSED:
+                return True
+            if monotonic() - self.__since < self.__reset:
+                return False
+            self.__state = self.HALF_OPEN
+            self.__since = monotonic()
+            return True
+    
+    
+    def isOpen(self):
+        ''' Method for checking whether the breaker is open
+            Returns: True if the calls are rejected, except for the trial ones, otherwise False
+        '''
+        return self.__state != self.CLOSED
+    
+    
+    def success(self):
+        ''' Method for recording a successful call '''
+        with self.__lock:
+            self.__failures = 0
+            self.__state = self.CLOSED
+    
+    
+    def failure(self):
+        ''' Method for recording a failed call '''
+        with self.__lock:
+            self.__failures += 1
+            if self.__state == self.HALF_OPEN or (self.__state == self.CLOSED and self.__failures >= self.__threshold):
+                self.__state = self.OPEN
+                self.__since = monotonic()
@@ -0,0 +1,40 @@
+from importlib import import_module
+import json
+
+
+class JsonEncoder():
+    ''' This class encodes objects as compact UTF-8 JSON with the fastest available library
+        The optional orjson and ujson packages are preferred in this order, falling back to the standard json module
+        Exposed methods:
+            > dumps(): given an object, retrieves its JSON encoding as bytes
+    '''
+    
+    LIBRARIES = ("orjson", "ujson", "json")
+    
+    def __init__(self, library=None):
+        ''' Constructor of the class
+            Arguments:
+                - library (optional): name of the preferred library among LIBRARIES, the fastest installed one if not provided, unknown or not installed
+        '''
+        for name in ((library,) if library in self.LIBRARIES else ()) + self.LIBRARIES:
+            try:
+                module = import_module(name)
+            except ImportError:
+                continue
+            self.library = name
+            if name == "orjson":
+                self.__encode = module.dumps
+            elif name == "ujson":
+                self.__encode = lambda obj: module.dumps(obj, ensure_ascii=False).encode()
+            else:
+                self.__encode = lambda obj: json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+            break
+    
+    
+    def dumps(self, obj):
+        ''' Method for encoding an object
+            Arguments:
+                - obj: object made of dictionaries, lists, strings, numbers, booleans and None
+            Returns: the JSON encoding as bytes
+        '''
+        return self.__encode(obj)
@@ -0,0 +1,33 @@
+from os import getpid
+from threading import Lock
+
+
+class Lazy():
+    ''' This class stands for an object which is built on its first use, and built again in every forked process
+        It keeps module-level services cheap to import, and their threads, connections and file handles private to each worker
+        Exposed methods: the same of the built object
+    '''
+    
+    def __init__(self, factory):
+        ''' Constructor of the class
+            Arguments:
+                - factory: callable building the object
+        '''
+        self.__factory = factory
+        self.__instance = None
+        self.__pid = None
+        self.__lock = Lock()
+    
+    
+    def __resolve(self):
+        ''' Method for retrieve the object of the current process, building it if needed '''
+        if self.__pid != getpid():
+            with self.__lock:
+                if self.__pid != getpid():
+                    self.__instance = self.__factory()
+                    self.__pid = getpid()
+        return self.__instance
+    
+    
+    def __getattr__(self, name):
+        return getattr(self.__resolve(), name)
@@ -0,0 +1,138 @@
+from bisect import bisect_left
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+
+
+class Metrics():
+    ''' This class collects counters and histograms in memory and renders them in the Prometheus text exposition format
+        Recording a sample only updates a counter under a lock, all the formatting work is done when metrics are scraped
+        Exposed methods:
+            > describe(): given a metric name, sets its description
+            > inc(): given a counter name and its labels, increments the counter
+            > observe(): given a histogram name, a value and its labels, records the value
+            > timed(): decorator recording the duration of each call of a function into a histogram
+            > collect(): given a function, calls it at every scrape to provide further samples (e.g. cache counters)
+            > render(): retrieves all the metrics in Prometheus text format
+    '''
+    
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    
+    def __init__(self):
+        ''' Constructor of the class '''
+        self.__lock = Lock()
+        self.__counters = {}
+        self.__histograms = {}
+        self.__help = {}
+        self.__collectors = {}
+    
+    
+    def describe(self, name, description):
+        ''' Method for setting the description of a metric
+            Arguments:
+                - name: string containing the metric name
+                - description: string describing the metric
+        '''
+        self.__help[name] = description
+    
+    
+    def inc(self, name, amount=1, **labels):
+        ''' Method for incrementing a counter
+            Arguments:
+                - name: string containing the counter name
+                - amount (optional): number to add to the counter
+                - labels: label values identifying the series
+        '''
+        key = tuple(sorted(labels.items()))
+        with self.__lock:
+            series = self.__counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+    
+    
+    def observe(self, name, value, **labels):
+        ''' Method for recording a value into a histogram
+            Arguments:
+                - name: string containing the histogram name
+                - value: number to record
+                - labels: label values identifying the series
+        '''
+        key = tuple(sorted(labels.items()))
+        bucket = bisect_left(self.BUCKETS, value)
+        with self.__lock:
+            series = self.__histograms.setdefault(name, {})
+            sample = series.get(key)
+            if sample is None:
+                sample = series[key] = [[0] * (len(self.BUCKETS) + 1), 0.0]
+            sample[0][bucket] += 1
+            sample[1] += value
+    
+    
+    def timed(self, name, **labels):
+        ''' Decorator for recording the duration in seconds of each call of the decorated function
+            Arguments:
+                - name: string containing the histogram name
+                - labels: label values identifying the series
+        '''
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                start = perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(name, perf_counter() - start, **labels)
+            return wrapper
+        return decorator
+    
+    
+    def collect(self, collector):
+        ''' Method for registering a function called at every scrape
+            NOTE: a method replaces the one registered by another instance of its class, e.g. built again after a fork
+            Arguments:
+                - collector: function returning a list of (name, type, labels, value) tuples
+        '''
+        self.__collectors[getattr(collector, "__qualname__", collector)] = collector
+    
+    
+    def __labels(self, key, extra=()):
+        ''' Method for formatting a set of labels '''
+        pairs = ['{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in key + extra]
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+    
+    
+    def __header(self, lines, name, kind):
+        ''' Method for appending the HELP and TYPE lines of a metric '''
+        if name in self.__help:
+            lines.append("# HELP {} {}".format(name, self.__help.get(name)))
+        lines.append("# TYPE {} {}".format(name, kind))
+    
+    
+    def render(self):
+        ''' Method for rendering all the metrics
+            Returns: string containing the metrics in Prometheus text exposition format
+        '''
+        with self.__lock:
+            counters = {name: dict(series) for name, series in self.__counters.items()}
+            histograms = {name: {key: (list(sample[0]), sample[1]) for key, sample in series.items()} for name, series in self.__histograms.items()}
+        gauges = {}
+        for collector in list(self.__collectors.values()):
+            for name, kind, labels, value in collector():
+                series = counters.setdefault(name, {}) if kind == "counter" else gauges.setdefault(name, {})
+                series[tuple(sorted(labels.items()))] = value
+        lines = []
+        for name, series in sorted(counters.items()):
+            self.__header(lines, name, "counter")
+            lines.extend("{}{} {}".format(name, self.__labels(key), value) for key, value in sorted(series.items()))
+        for name, series in sorted(gauges.items()):
+            self.__header(lines, name, "gauge")
+            lines.extend("{}{} {}".format(name, self.__labels(key), value) for key, value in sorted(series.items()))
+        for name, series in sorted(histograms.items()):
+            self.__header(lines, name, "histogram")
+            for key, (buckets, total) in sorted(series.items()):
+                count = 0
+                for bound, hits in zip(self.BUCKETS + ("+Inf",), buckets):
+                    count += hits
+                    lines.append("{}_bucket{} {}".format(name, self.__labels(key, (("le", bound),)), count))
+                lines.append("{}_sum{} {}".format(name, self.__labels(key), total))
+                lines.append("{}_count{} {}".format(name, self.__labels(key), count))
+        return "\n".join(lines) + "\n"
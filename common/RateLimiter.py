@@ -0,0 +1,33 @@
+from threading import Lock
+from time import monotonic, sleep
+
+
+class RateLimiter():
+    ''' This class implements a thread-safe token bucket limiting the rate of some operations
+        Exposed methods:
+            > acquire(): waits until an operation is allowed
+    '''
+    
+    def __init__(self, rate, burst=1):
+        ''' Constructor of the class
+            Arguments:
+                - rate: number of operations allowed per second
+                - burst (optional): number of operations allowed at once after an idle period
+        '''
+        self.__rate = rate
+        self.__burst = burst
+        self.__tokens = burst
+        self.__last = monotonic()
+        self.__lock = Lock()
+    
+    
+    def acquire(self):
+        ''' Method for waiting until a token is available and consuming it '''
+        with self.__lock:
+            now = monotonic()
+            self.__tokens = min(self.__burst, self.__tokens + (now - self.__last) * self.__rate)
+            self.__last = now
+            self.__tokens -= 1
+            wait = -self.__tokens / self.__rate if self.__tokens < 0 else 0
+        if wait:
+            sleep(wait)
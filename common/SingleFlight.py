@@ -0,0 +1,43 @@
+from threading import Event, Lock
+
+
+class SingleFlight():
+    ''' This class coalesces concurrent calls sharing the same key, so that only one of them is actually executed
+        Exposed methods:
+            > do(): given a key and a function, executes the function unless an identical call is already in flight, in which case it waits for its result
+    '''
+    
+    def __init__(self):
+        ''' Constructor of the class '''
+        self.__calls = {}
+        self.__lock = Lock()
+    
+    
+    def do(self, key, function, *args):
+        ''' Method for execute a function once for all the concurrent callers with the same key
+            Arguments:
+                - key: hashable object identifying the logical call
+                - function: callable to execute
+                - args: positional arguments for the callable
+            Returns: the value returned by the function, shared by all the callers waiting on the same key
+        '''
+        with self.__lock:
+            call = self.__calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.__calls[key] = {"done": Event(), "result": None, "error": None}
+        if not leader:
+            call.get("done").wait()
+            if call.get("error"):
+                raise call.get("error")
+            return call.get("result")
+        try:
+            call["result"] = function(*args)
+            return call.get("result")
+        except Exception as error:
+            call["error"] = error
+            raise
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+            call.get("done").set()
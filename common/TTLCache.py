@@ -0,0 +1,105 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+
+class TTLCache():
+    ''' This class implements a thread-safe in-memory LRU cache whose entries expire after a time-to-live
+        Exposed methods:
+            > get(): given a key, retrieves the related value if present and not expired, or even if expired when stale values are accepted
+            > put(): given a key, a value and a TTL, stores the value evicting the least recently used entries if needed
+            > invalidate(): given a key, removes the related entry
+            > clear(): removes all the entries
+            > stats(): retrieves hit/miss/eviction counters and the current occupation
+    '''
+    
+    def __init__(self, maxEntries, maxBytes=None):
+        ''' Constructor of the class
+            Arguments:
+                - maxEntries: integer representing the maximum number of entries to keep
+                - maxBytes (optional): integer representing the maximum total size of the entries
+        '''
+        self.__entries = OrderedDict()
+        self.__lock = Lock()
+        self.__maxEntries = maxEntries
+        self.__maxBytes = maxBytes
+        self.__bytes = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+    
+    
+    def __remove(self, key):
+        ''' Method for remove an entry and release its size (lock must be held) '''
+        self.__bytes -= self.__entries.pop(key)[1]
+    
+    
+    def get(self, key, stale=False):
+        ''' Method for retrieve a value from the cache
+            NOTE: expired entries are kept until they are evicted or replaced, so that they can be served as stale values
+            Arguments:
+                - key: hashable object identifying the entry
+                - stale (optional): boolean accepting an expired entry
+            Returns: the stored value if present and not expired (unless stale), otherwise None (null object)
+        '''
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or (entry[0] <= monotonic() and not stale):
+                self.__misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return entry[2]
+    
+    
+    def put(self, key, value, ttl, size=0):
+        ''' Method for store a value into the cache
+            Arguments:
+                - key: hashable object identifying the entry
+                - value: object to store
+                - ttl: number of seconds the entry is valid for
+                - size (optional): integer representing the size of the value, counted against maxBytes
+        '''
+        if ttl <= 0 or (self.__maxBytes and size > self.__maxBytes):
+            return
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove(key)
+            self.__entries[key] = (monotonic() + ttl, size, value)
+            self.__bytes += size
+            while len(self.__entries) > self.__maxEntries or (self.__maxBytes and self.__bytes > self.__maxBytes):
+                self.__remove(next(iter(self.__entries)))
+                self.__evictions += 1
+    
+    
+    def invalidate(self, key):
+        ''' Method for remove an entry from the cache
+            Arguments:
+                - key: hashable object identifying the entry
+        '''
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove(key)
+    
+    
+    def clear(self):
+        ''' Method for remove all the entries from the cache '''
+        with self.__lock:
+            self.__entries.clear()
+            self.__bytes = 0
+    
+    
+    def stats(self):
+        ''' Method for retrieve the cache counters
+            Returns: a dictionary containing hits, misses, hit ratio, evictions, entries and bytes
+        '''
+        with self.__lock:
+            lookups = self.__hits + self.__misses
+            return {
+                "hits": self.__hits,
+                "misses": self.__misses,
+                "ratio": self.__hits / lookups if lookups else 0.0,
+                "evictions": self.__evictions,
+                "entries": len(self.__entries),
+                "bytes": self.__bytes
+            }
@@ -0,0 +1,11 @@
+from os import environ
+from common.CircuitBreaker import CircuitBreaker
+from common.JsonEncoder import JsonEncoder
+from common.Lazy import Lazy
+from common.Metrics import Metrics
+from common.RateLimiter import RateLimiter
+from common.SingleFlight import SingleFlight
+from common.TTLCache import TTLCache
+
+metrics = Metrics()
+json_encoder = JsonEncoder(environ.get("JSON_ENCODER"))
@@ -0,0 +1,12 @@
+''' Gunicorn settings of the BusinessService
+    By default workers are sync: each worker process serves one request at a time, so scale WEB_CONCURRENCY with the load.
+    WEB_WORKER_CLASS=gevent lets a worker serve many requests waiting on cinema-adapter, but the sqlite3 module is not
+    cooperative: every cache database query blocks the whole worker and all of its greenlets until it returns.
+'''
+from os import environ
+
+
+worker_class = environ.get("WEB_WORKER_CLASS", "sync")
+workers = int(environ.get("WEB_CONCURRENCY", 2))
+worker_connections = int(environ.get("WEB_WORKER_CONNECTIONS", 500))
+timeout = int(environ.get("WEB_TIMEOUT", 30))
@@ -0,0 +1,12 @@
+''' Offline tests of the BusinessService
+    Usage: python -m unittest discover -s tests -t .
+    They run against the fake CinemaAdapter and a temporary SQLite cache database, configured here before the services are imported.
+    NOTE: a bare python -m unittest imports the top-level packages during discovery, hence against the default cache database
+'''
+from os import environ, path
+from tempfile import mkdtemp
+
+
+environ["CACHE_DATABASE_URL"] = "sqlite:///" + path.join(mkdtemp(), "cache.db")
+environ["CINEMA_ADAPTER"] = "fake"
+environ["WARMER_ENABLED"] = "false"
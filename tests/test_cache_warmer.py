@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from time import perf_counter
+from unittest import TestCase
+from adapter import adapter_service
+from business import cinema_service
+from business.CacheWarmer import CacheWarmer
+from cache import cache_service
+
+
+POSITION = "45.40;11.87"
+DATETIME = "2026-01-01T20:00:00"
+ALWAYS = 365 * 24 * 3600
+
+
+class FailingBusiness:
+    ''' CinemaBusiness whose showings refreshes always fail '''
+    
+    def __init__(self):
+        self.calls = 0
+    
+    
+    def findShowings(self, position, datetime, cinema, date, fresh=False):
+        self.calls += 1
+
+
+class CacheWarmerTest(TestCase):
+    ''' Tests of the CacheWarmer refresh rounds against the fake CinemaAdapter '''
+    
+    def setUp(self):
+        self.today = datetime.utcnow().date().isoformat()
+    
+    
+    def track(self, warmer, cinema, times=1, date=None):
+        for _ in range(times):
+            warmer.track(POSITION, DATETIME, cinema, date or self.today)
+    
+    
+    def refresh(self, warmer):
+        ''' Runs a refresh round, returning the refreshes and the upstream calls it performed '''
+        calls = adapter_service.calls
+        refreshes = warmer.refresh()
+        return refreshes, adapter_service.calls - calls
+    
+    
+    def test_refreshes_top_cinemas_only(self):
+        warmer = CacheWarmer(cinema_service, cache_service, top=2, ahead=ALWAYS, rate=1000)
+        self.track(warmer, "rank-a", 5)
+        self.track(warmer, "rank-b", 3)
+        self.track(warmer, "rank-c", 1)
+        self.assertEqual(self.refresh(warmer), (2, 2))
+        self.assertIsNotNone(cache_service.getSnapshot("rank-a", self.today))
+        self.assertIsNotNone(cache_service.getSnapshot("rank-b", self.today))
+        self.assertIsNone(cache_service.getSnapshot("rank-c", self.today))
+    
+    
+    def test_counters_decay_between_rounds(self):
+        warmer = CacheWarmer(cinema_service, cache_service, top=1, ahead=ALWAYS, rate=1000)
+        self.track(warmer, "decay-a", 4)
+        self.track(warmer, "decay-b", 1)
+        self.refresh(warmer)
+        self.track(warmer, "decay-b", 3)
+        self.refresh(warmer)
+        self.assertIsNotNone(cache_service.getSnapshot("decay-b", self.today))
+        self.assertEqual(self.refresh(warmer), (1, 1))
+        self.assertEqual(self.refresh(warmer), (0, 0))
+    
+    
+    def test_past_dates_are_dropped(self):
+        warmer = CacheWarmer(cinema_service, cache_service, top=1, ahead=ALWAYS, rate=1000)
+        yesterday = (datetime.utcnow().date() - timedelta(days=1)).isoformat()
+        self.track(warmer, "past", 2, yesterday)
+        self.assertEqual(self.refresh(warmer), (0, 0))
+    
+    
+    def test_refreshes_only_due_showings(self):
+        warmer = CacheWarmer(cinema_service, cache_service, top=1, ahead=0, rate=1000)
+        self.track(warmer, "due", 8)
+        self.assertEqual(self.refresh(warmer), (1, 1))
+        self.assertEqual(self.refresh(warmer), (0, 0))
+    
+    
+    def test_refreshes_only_cached_and_due_cinemas(self):
+        cinema = cinema_service.findNearby(POSITION, DATETIME, 1).get("cinemas")[0].get("cinema_id")
+        cinema_service.findShowings(POSITION, DATETIME, cinema, self.today)
+        notDue = CacheWarmer(cinema_service, cache_service, top=1, ahead=0, rate=1000)
+        self.track(notDue, cinema, 2)
+        self.assertEqual(self.refresh(notDue), (0, 0))
+        due = CacheWarmer(cinema_service, cache_service, top=1, ahead=ALWAYS, rate=1000)
+        self.track(due, cinema, 2)
+        expiry = cache_service.getCinemaExpiry(cinema)
+        self.assertEqual(self.refresh(due), (2, 2))
+        self.assertGreater(cache_service.getCinemaExpiry(cinema), expiry)
+    
+    
+    def test_refreshes_are_rate_limited(self):
+        warmer = CacheWarmer(cinema_service, cache_service, top=5, ahead=ALWAYS, rate=20)
+        for i in range(5):
+            self.track(warmer, "rate-{:d}".format(i))
+        start = perf_counter()
+        self.assertEqual(self.refresh(warmer), (5, 5))
+        self.assertGreaterEqual(perf_counter() - start, 4 / 20 * 0.9)
+    
+    
+    def test_invalid_and_far_dates_are_ignored(self):
+        warmer = CacheWarmer(cinema_service, cache_service, top=1, ahead=ALWAYS, rate=1000, days=7)
+        far = (datetime.utcnow().date() + timedelta(days=8)).isoformat()
+        for date in ("9999-99-99", "zz", "2026-13-01", far):
+            self.track(warmer, "invalid", 5, date)
+        self.assertEqual(self.refresh(warmer), (0, 0))
+    
+    
+    def test_failed_dates_are_dropped(self):
+        business = FailingBusiness()
+        warmer = CacheWarmer(business, cache_service, top=1, ahead=ALWAYS, rate=1000)
+        self.track(warmer, "failing", 8)
+        self.assertEqual(warmer.refresh(), 0)
+        self.assertEqual(warmer.refresh(), 0)
+        self.assertEqual(business.calls, 1)
@@ -0,0 +1,95 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+from time import sleep
+from importlib import import_module
+from unittest import TestCase
+from adapter.AdapterService import AdapterService
+from common import CircuitBreaker
+
+
+adapter_module = import_module("adapter.AdapterService")
+
+
+class CircuitBreakerTest(TestCase):
+    ''' Tests of the CircuitBreaker states '''
+    
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(3, 60)
+        for _ in range(2):
+            breaker.failure()
+        breaker.success()
+        breaker.failure()
+        self.assertTrue(breaker.allow())
+        breaker.failure()
+        breaker.failure()
+        self.assertFalse(breaker.allow())
+        self.assertTrue(breaker.isOpen())
+    
+    
+    def test_half_open_lets_one_trial_through(self):
+        breaker = CircuitBreaker(1, 0.05)
+        breaker.failure()
+        self.assertFalse(breaker.allow())
+        sleep(0.06)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.failure()
+        self.assertFalse(breaker.allow())
+        sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.success()
+        self.assertFalse(breaker.isOpen())
+        self.assertTrue(breaker.allow())
+
+
+class Upstream(BaseHTTPRequestHandler):
+    ''' Fake cinema-adapter answering 500 for the showtimes of the cinema "bad" '''
+    
+    def do_GET(self):
+        status = 500 if "cinema_id=bad" in self.path else 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b'{"films": []}')
+    
+    
+    def log_message(self, *args):
+        pass
+
+
+class AdapterBreakerTest(TestCase):
+    ''' Tests of the circuit breakers of AdapterService against a local fake cinema-adapter '''
+    
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), Upstream)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        configs = dict(adapter_module.load_configs(), **{"cinema-adapter": "http://127.0.0.1:{:d}".format(self.server.server_port)})
+        configs["breaker"] = {"failures": 3, "reset": 0.1}
+        self.load_configs = adapter_module.load_configs
+        adapter_module.load_configs = lambda: configs
+        self.adapter = AdapterService()
+    
+    
+    def tearDown(self):
+        adapter_module.load_configs = self.load_configs
+        self.server.shutdown()
+        self.server.server_close()
+    
+    
+    def showtimes(self, cinema):
+        return self.adapter.getShowtimes("45.40;11.87", "2026-01-01T20:00:00", cinema, "2026-01-01", fresh=True)
+    
+    
+    def test_failing_request_does_not_keep_endpoint_open(self):
+        for _ in range(3):
+            self.assertIsNone(self.showtimes("bad"))
+        self.assertFalse(self.adapter.isAvailable("showtimes"))
+        self.assertIsNone(self.showtimes("good"))
+        sleep(0.15)
+        self.assertEqual(self.showtimes("good"), {"films": []})
+        self.assertTrue(self.adapter.isAvailable("showtimes"))
+    
+    
+    def test_every_endpoint_has_a_breaker(self):
+        for endpoint in AdapterService.ENDPOINTS:
+            self.assertTrue(self.adapter.isAvailable(endpoint))
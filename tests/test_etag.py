@@ -0,0 +1,34 @@
+from datetime import datetime
+from hashlib import sha1
+from json import dumps
+from unittest import TestCase
+from adapter import adapter_service
+from business import cinema_service
+from cache import cache_service
+
+
+POSITION = "45.40;11.87"
+DATETIME = "2026-01-01T20:00:00"
+
+
+class ETagTest(TestCase):
+    ''' Tests of the digests stored with the showings, used as ETags without reading the payload '''
+    
+    def setUp(self):
+        self.today = datetime.utcnow().date().isoformat()
+    
+    
+    def test_digest_identifies_the_stored_payload(self):
+        self.assertIsNone(cinema_service.findShowingsDigest(POSITION, DATETIME, "etag", self.today))
+        payload = cinema_service.findDetailedShowings(POSITION, DATETIME, "etag", self.today)
+        digest = cinema_service.findShowingsDigest(POSITION, DATETIME, "etag", self.today)
+        self.assertEqual(digest, sha1(dumps(payload, separators=(",", ":")).encode()).hexdigest())
+        self.assertEqual(cache_service.getSnapshotDigest("etag", self.today), digest)
+    
+    
+    def test_matching_digest_needs_no_upstream_call(self):
+        cinema_service.findShowings(POSITION, DATETIME, "etag-match", self.today)
+        calls = adapter_service.calls
+        digest = cinema_service.findShowingsDigest(POSITION, DATETIME, "etag-match", self.today)
+        self.assertEqual(cinema_service.findShowingsDigest(POSITION, DATETIME, "etag-match", self.today, {digest}), digest)
+        self.assertEqual(adapter_service.calls, calls)
@@ -0,0 +1,16 @@
+from unittest import TestCase
+from common import JsonEncoder
+
+
+class JsonEncoderTest(TestCase):
+    ''' Tests of the JsonEncoder library choice '''
+    
+    def test_forced_library_is_used(self):
+        encoder = JsonEncoder("json")
+        self.assertEqual(encoder.library, "json")
+        self.assertEqual(encoder.dumps({"name": "Città", "ids": [1, 2]}), '{"name":"Città","ids":[1,2]}'.encode())
+    
+    
+    def test_unknown_library_is_ignored(self):
+        for library in ("simplejson", "pickle", "missing"):
+            self.assertEqual(JsonEncoder(library).library, JsonEncoder().library)
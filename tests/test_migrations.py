@@ -0,0 +1,85 @@
+from os import path
+from tempfile import mkdtemp
+from unittest import TestCase
+from sqlalchemy import inspect
+from cache.Configuration import create_cache_engine, start_db
+from cache.Migrations import MIGRATIONS
+import sqlite3
+
+
+BASELINE_SCHEMA = ["""CREATE TABLE "CINEMAS" (
+    cinema_id VARCHAR(12) NOT NULL,
+    cinema_name VARCHAR(30) NOT NULL,
+    address VARCHAR(30) NOT NULL,
+    city VARCHAR(30) NOT NULL,
+    lat VARCHAR(12) NOT NULL,
+    lng VARCHAR(12) NOT NULL,
+    contact VARCHAR(256),
+    url VARCHAR(128),
+    hours VARCHAR(256),
+    PRIMARY KEY (cinema_id)
+)""", """CREATE TABLE "SHOWTIMES" (
+    id INTEGER NOT NULL,
+    cinema_id VARCHAR(12) NOT NULL,
+    film_id VARCHAR(12) NOT NULL,
+    film_name VARCHAR(128) NOT NULL,
+    showings VARCHAR(1024) NOT NULL,
+    show_dates VARCHAR(1024) NOT NULL,
+    PRIMARY KEY (id)
+)"""]
+
+
+class MigrationsTest(TestCase):
+    ''' Tests of the schema migrations of a cache database created by the first release of the service '''
+    
+    def setUp(self):
+        self.file = path.join(mkdtemp(), "cache.db")
+        connection = sqlite3.connect(self.file)
+        for statement in BASELINE_SCHEMA:
+            connection.execute(statement)
+        connection.execute("""INSERT INTO CINEMAS VALUES ('1', 'Cinema 1', 'Via Roma 1', 'Padova', '45.4064', '11.8768', '{"phone":"1"}', '{}', '{}')""")
+        connection.executemany("INSERT INTO SHOWTIMES (id, cinema_id, film_id, film_name, showings, show_dates) VALUES (?, ?, ?, ?, '{}', '[]')",
+                               [(1, "1", "10", "old"), (2, "1", "10", "new"), (3, "1", "11", "other")])
+        connection.commit()
+        connection.close()
+        self.engine = create_cache_engine("sqlite:///" + self.file)
+    
+    
+    def tearDown(self):
+        self.engine.dispose()
+    
+    
+    def columns(self, table):
+        return {column.get("name"): column for column in inspect(self.engine).get_columns(table)}
+    
+    
+    def test_migrates_baseline_database(self):
+        start_db(self.engine)
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.execute("PRAGMA user_version").scalar(), len(MIGRATIONS))
+            cinema = connection.execute("SELECT lat, lng, cell, contact, expires_at FROM CINEMAS").fetchone()
+            showtimes = connection.execute("SELECT id, film_name FROM SHOWTIMES ORDER BY id").fetchall()
+        self.assertEqual(tuple(cinema), (45.4064, 11.8768, "908:237", '{"phone":"1"}', None))
+        self.assertEqual([tuple(row) for row in showtimes], [(2, "new"), (3, "other")])
+        self.assertNotIn("showings", self.columns("SHOWTIMES"))
+        self.assertIn("ux_SHOWTIMES_cinema_film", [index.get("name") for index in inspect(self.engine).get_indexes("SHOWTIMES")])
+        self.assertTrue({"projection", "digest"} <= set(self.columns("SNAPSHOTS")))
+        self.assertTrue({"SHOWINGS", "ROUTES", "COVERAGE"} <= set(inspect(self.engine).get_table_names()))
+    
+    
+    def test_migrations_run_once(self):
+        start_db(self.engine)
+        with self.engine.connect() as connection:
+            connection.execute("INSERT INTO SHOWTIMES (cinema_id, film_id, film_name, show_dates) VALUES ('2', '10', 'kept', '[]')")
+        start_db(self.engine)
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM SHOWTIMES").scalar(), 3)
+    
+    
+    def test_creates_new_database(self):
+        engine = create_cache_engine("sqlite:///" + path.join(mkdtemp(), "cache.db"))
+        start_db(engine)
+        with engine.connect() as connection:
+            self.assertEqual(connection.execute("PRAGMA user_version").scalar(), len(MIGRATIONS))
+        self.assertTrue({"CINEMAS", "SHOWTIMES", "SHOWINGS", "SNAPSHOTS", "ROUTES"} <= set(inspect(engine).get_table_names()))
+        engine.dispose()
@@ -0,0 +1,37 @@
+from unittest import TestCase
+from adapter import adapter_service
+from business import cinema_service
+from cache import cache_service
+
+
+DATETIME = "2026-01-01T20:00:00"
+
+
+class NearbyTest(TestCase):
+    ''' Tests of the local nearby search over the cinemas cached by the previous searches '''
+    
+    def nearby(self, position, n):
+        ''' Runs a nearby search, returning the cinema IDs and the upstream calls it performed '''
+        calls = adapter_service.calls
+        cinemas = cinema_service.findNearby(position, DATETIME, n).get("cinemas")
+        return [cinema.get("cinema_id") for cinema in cinemas], adapter_service.calls - calls
+    
+    
+    def test_covered_area_is_answered_locally(self):
+        cinemas, _ = self.nearby("41.90;12.49", 10)
+        self.assertEqual(self.nearby("41.90;12.49", 5), (cinemas[:5], 0))
+        self.assertEqual(self.nearby("41.901;12.489", 3), (cinemas[:3], 0))
+    
+    
+    def test_uncovered_area_goes_upstream(self):
+        self.nearby("40.85;14.27", 10)
+        cinemas, calls = self.nearby("40.88;14.27", 5)
+        self.assertGreater(calls, 0)
+        self.assertEqual(cinemas, [cinema.get("cinema_id") for cinema in adapter_service.getNearby("40.88;14.27", DATETIME, 5).get("cinemas")])
+    
+    
+    def test_coverage_stops_at_the_nearest_missing_cinema(self):
+        cinemas = [{"lat": 43.77 + 0.005 * i, "lng": 11.25} for i in range(1, 6)]
+        cache_service.saveCoverage("43.77;11.25", cinemas, cinemas[2:])
+        self.assertTrue(cache_service.isCovered(43.77, 11.25, 0.5))
+        self.assertFalse(cache_service.isCovered(43.77, 11.25, 1.5))
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+from importlib import import_module
+from unittest import TestCase
+from unittest.mock import patch
+from business import cinema_service
+from cache import cache_service
+from cache.Configuration import Session
+from cache.models import Snapshot
+
+
+business_module = import_module("business.CinemaBusiness")
+POSITION = "45.40;11.87"
+DATETIME = "2026-01-01T20:00:00"
+
+
+class UnavailableAdapter:
+    ''' AdapterService giving no result, with the circuit breakers open or closed '''
+    
+    def __init__(self, opened):
+        self.opened = opened
+    
+    
+    def getShowtimes(self, geolocation, datetime, cinema, date, fresh=False):
+        return None
+    
+    
+    def isAvailable(self, endpoint):
+        return not self.opened
+
+
+class StaleTest(TestCase):
+    ''' Tests of the stale data served while the circuit breakers of the adapter are open '''
+    
+    def setUp(self):
+        self.today = datetime.utcnow().date().isoformat()
+        cache_service.saveShowtimesBatch([], {"cinema_id": "stale", "date": self.today, "payload": {"films": []}, "projection": {"films": []}})
+        Session.query(Snapshot).filter(Snapshot.cinema_id == "stale").update({"expires_at": datetime.utcnow() - timedelta(hours=1)}, synchronize_session=False)
+        Session.commit()
+        Session.remove()
+    
+    
+    def showings(self, opened):
+        with patch.object(business_module, "adapter_service", UnavailableAdapter(opened)):
+            return cinema_service.findShowings(POSITION, DATETIME, "stale", self.today)
+    
+    
+    def test_expired_showings_are_served_while_the_breaker_is_open(self):
+        self.assertEqual(self.showings(True), {"films": [], "stale": True})
+    
+    
+    def test_expired_showings_are_not_served_when_the_adapter_answers(self):
+        self.assertIsNone(self.showings(False))